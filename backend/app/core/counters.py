@@ -0,0 +1,117 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+from app.database.mongo import db
+
+# Write-behind counters (view counts, message/reply/post counts)
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "5"))
+# Flush early once this many documents have pending increments
+COUNTER_MAX_PENDING = int(os.getenv("COUNTER_MAX_PENDING", "5000"))
+
+
+class CounterBuffer:
+    """Coalesce ``$inc`` updates per document and write them in bulk.
+
+    Increments are summed in memory and flushed every ``interval`` seconds
+    with one unordered ``bulk_write`` per collection, so a hot document
+    costs one write per interval instead of one per request. Counts lag
+    the database by up to one interval. Increments a flush provably did not
+    write (rejected operations, or no server to send them to) are merged
+    back and retried on the next one; after any other error the server may
+    have applied the batch, so it is dropped and logged rather than risk
+    counting it twice.
+    """
+
+    def __init__(self, interval: float = COUNTER_FLUSH_INTERVAL, max_pending: int = COUNTER_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[ObjectId, Dict[str, int]]] = {}
+        self._pending_docs = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._flush_lock = asyncio.Lock()
+
+    def increment(self, collection_name: str, doc_id: ObjectId, field: str, amount: int = 1):
+        documents = self._pending.setdefault(collection_name, {})
+        fields = documents.get(doc_id)
+        if fields is None:
+            fields = documents[doc_id] = defaultdict(int)
+            self._pending_docs += 1
+        fields[field] += amount
+        if self._pending_docs >= self.max_pending:
+            self._wake.set()
+
+    def pending(self, collection_name: str, doc_id: ObjectId) -> Dict[str, int]:
+        return dict(self._pending.get(collection_name, {}).get(doc_id, {}))
+
+    def with_pending(self, collection_name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Add unflushed increments to a document read from the database."""
+        for field, amount in self.pending(collection_name, doc.get("_id")).items():
+            doc[field] = doc.get(field, 0) + amount
+        return doc
+
+    def _merge(self, batch: Dict[str, Dict[ObjectId, Dict[str, int]]]):
+        for collection_name, documents in batch.items():
+            for doc_id, fields in documents.items():
+                for field, amount in fields.items():
+                    self.increment(collection_name, doc_id, field, amount)
+
+    async def flush(self):
+        """Write every pending increment now."""
+        async with self._flush_lock:
+            batch, self._pending, self._pending_docs = self._pending, {}, 0
+            self._wake.clear()
+            failed = {}
+            for collection_name, documents in batch.items():
+                doc_ids = list(documents)
+                operations = [UpdateOne({"_id": doc_id}, {"$inc": dict(documents[doc_id])}) for doc_id in doc_ids]
+                if not operations:
+                    continue
+                try:
+                    await getattr(db, collection_name).bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    # Unordered: everything but the reported operations was applied
+                    print(f"Error flushing {collection_name} counters: {e}")
+                    failed[collection_name] = {
+                        doc_ids[error["index"]]: documents[doc_ids[error["index"]]]
+                        for error in e.details.get("writeErrors", [])
+                    }
+                except ServerSelectionTimeoutError as e:
+                    # Never sent: nothing was applied
+                    print(f"Error flushing {collection_name} counters: {e}")
+                    failed[collection_name] = documents
+                except Exception as e:
+                    # E.g. a timeout after the server applied the batch: retrying could double count
+                    print(f"Error flushing {collection_name} counters, increments dropped: {e}")
+            # Counters are commutative, so a retry of unwritten increments is still exact
+            self._merge(failed)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flush loop and write what is left."""
+        # Let an in-progress bulk write finish rather than cancelling it
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+counters = CounterBuffer()
@@ -0,0 +1,164 @@
+import asyncio
+import bisect
+import heapq
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from app.core.cache import TTLCache
+from app.core.pagination import SORT_NEWEST_FIRST, encode_cursor, keyset_filter
+from app.database.mongo import db
+
+# Home feed across a user's joined pods
+FEED_TIMELINE_CACHE = os.getenv("FEED_TIMELINE_CACHE", "false").lower() == "true"
+# Only users in at least this many pods get a cached timeline
+FEED_TIMELINE_MIN_PODS = int(os.getenv("FEED_TIMELINE_MIN_PODS", "10"))
+FEED_TIMELINE_SIZE = int(os.getenv("FEED_TIMELINE_SIZE", "500"))
+FEED_TIMELINE_USERS = int(os.getenv("FEED_TIMELINE_USERS", "10000"))
+# Bounds staleness from posts written by other workers, which never reach this cache
+FEED_TIMELINE_TTL = int(os.getenv("FEED_TIMELINE_TTL", "60"))
+
+# (createdAt, _id) sorts posts the same way as SORT_NEWEST_FIRST, reversed
+FeedKey = Tuple[datetime, ObjectId]
+
+
+def feed_key(post: Dict[str, Any]) -> FeedKey:
+    return (post.get("createdAt") or datetime.min, post["_id"])
+
+
+def feed_cursor(keys: List[FeedKey], limit: int) -> Optional[str]:
+    """Cursor after the last merged key, so missing posts never end the feed early."""
+    if len(keys) < limit:
+        return None
+    created_at, post_id = keys[-1]
+    return encode_cursor({"createdAt": None if created_at == datetime.min else created_at, "_id": post_id})
+
+
+async def _newest_pod_keys(pod_id: ObjectId, position: Optional[FeedKey], limit: int) -> List[dict]:
+    filter_query: Dict[str, Any] = {"podId": pod_id}
+    if position is not None:
+        filter_query = {"$and": [filter_query, keyset_filter(*position, "$lt")]}
+    # Covered by the (podId, createdAt, _id) index: no documents are fetched
+    cursor = db.posts.find(filter_query, {"_id": 1, "createdAt": 1}).sort(SORT_NEWEST_FIRST).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def merge_pod_keys(pod_ids: List[ObjectId], position: Optional[FeedKey], limit: int) -> List[FeedKey]:
+    """Keys of the newest ``limit`` posts across pods, before ``position``.
+
+    Each pod is read newest first from its index range concurrently, and
+    the runs are combined with a k-way merge.
+    """
+    runs = await asyncio.gather(*(_newest_pod_keys(pod_id, position, limit) for pod_id in pod_ids))
+    merged = heapq.merge(*runs, key=feed_key, reverse=True)
+    return [feed_key(post) for post in islice(merged, limit)]
+
+
+async def load_posts(keys: List[FeedKey]) -> List[dict]:
+    """Fetch full posts for merged keys, in key order."""
+    if not keys:
+        return []
+    ids = [post_id for _, post_id in keys]
+    found = {post["_id"]: post async for post in db.posts.find({"_id": {"$in": ids}})}
+    return [found[post_id] for post_id in ids if post_id in found]
+
+
+class _Timeline:
+    __slots__ = ("keys", "complete")
+
+    def __init__(self, keys: List[FeedKey], complete: bool):
+        # Oldest first, so new posts append and pages slice from the end
+        self.keys = keys
+        # True while keys hold every post in the user's pods
+        self.complete = complete
+
+
+class TimelineCache:
+    """Fan-out-on-write home timelines for users in many pods.
+
+    A timeline is materialized on the user's first feed read and then
+    kept current by ``publish`` from the post write path, so later pages
+    skip the per-pod merge. Timelines are per process and expire after
+    FEED_TIMELINE_TTL seconds, which bounds how long posts written by
+    other workers can be missing.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = FEED_TIMELINE_CACHE,
+        min_pods: int = FEED_TIMELINE_MIN_PODS,
+        size: int = FEED_TIMELINE_SIZE,
+        max_users: int = FEED_TIMELINE_USERS,
+        ttl: int = FEED_TIMELINE_TTL
+    ):
+        self.enabled = enabled
+        self.min_pods = min_pods
+        self.size = size
+        self._timelines = TTLCache(maxsize=max_users, ttl=ttl)
+        # pod id -> users whose timeline includes the pod
+        self._subscribers: Dict[ObjectId, Set[Any]] = {}
+
+    def wants(self, pod_ids: List[ObjectId]) -> bool:
+        return self.enabled and len(pod_ids) >= self.min_pods
+
+    async def page(
+        self,
+        user_id: Any,
+        pod_ids: List[ObjectId],
+        position: Optional[FeedKey],
+        limit: int
+    ) -> Optional[List[FeedKey]]:
+        """Newest-first keys before ``position``, or None if the timeline cannot answer."""
+        timeline = self._timelines.get(user_id)
+        if timeline is None:
+            keys = await merge_pod_keys(pod_ids, None, self.size)
+            timeline = _Timeline(keys[::-1], complete=len(keys) < self.size)
+            self._timelines.set(user_id, timeline)
+            for pod_id in pod_ids:
+                self._subscribers.setdefault(pod_id, set()).add(user_id)
+
+        if position is None:
+            end = len(timeline.keys)
+        else:
+            end = bisect.bisect_left(timeline.keys, (position[0] or datetime.min, position[1]))
+        start = end - limit
+        if start < 0 and not timeline.complete:
+            # The page reaches past the oldest cached post
+            return None
+        return timeline.keys[max(0, start):end][::-1]
+
+    def publish(self, pod_id: ObjectId, post: Dict[str, Any]):
+        """Add a new post to the timelines of users in its pod."""
+        subscribers = self._subscribers.get(pod_id)
+        if not subscribers:
+            return
+        key = feed_key(post)
+        for user_id in list(subscribers):
+            timeline = self._timelines.get(user_id)
+            if timeline is None:
+                subscribers.discard(user_id)
+                continue
+            bisect.insort(timeline.keys, key)
+            if len(timeline.keys) > self.size:
+                del timeline.keys[0]
+                timeline.complete = False
+        if not subscribers:
+            del self._subscribers[pod_id]
+
+    def discard(self, user_id: Any, keys: List[FeedKey]):
+        """Remove keys whose posts no longer exist from a user's timeline."""
+        timeline = self._timelines.get(user_id)
+        if timeline is None:
+            return
+        for key in keys:
+            index = bisect.bisect_left(timeline.keys, key)
+            if index < len(timeline.keys) and timeline.keys[index] == key:
+                del timeline.keys[index]
+
+    def invalidate(self, user_id: Any):
+        """Drop a user's timeline, e.g. after they join a pod."""
+        self._timelines.pop(user_id)
+
+
+feed_timelines = TimelineCache()
@@ -1,7 +1,21 @@
 import firebase_admin
 from firebase_admin import credentials, auth
+import asyncio
+import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
+from app.core.cache import TTLCache
+
+# Verified ID token cache, keyed by SHA-256 of the raw token
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_VERIFY_WORKERS = int(os.getenv("TOKEN_VERIFY_WORKERS", "4"))
+FIREBASE_CERT_REFRESH_INTERVAL = int(os.getenv("FIREBASE_CERT_REFRESH_INTERVAL", "1800"))
+
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+_verify_executor = ThreadPoolExecutor(max_workers=TOKEN_VERIFY_WORKERS, thread_name_prefix="token-verify")
 
 # Initialize Firebase Admin SDK
 def initialize_firebase():
@@ -31,6 +45,41 @@ def verify_token(id_token: str) -> Dict[str, Any]:
     except Exception as e:
         raise ValueError(f"Invalid token: {e}")
 
+async def verify_token_cached(id_token: str) -> Dict[str, Any]:
+    """Verify Firebase ID token, reusing recent results.
+
+    Cache misses are verified on a thread pool so signature checks and
+    certificate fetches never block the event loop. Entries never outlive
+    the token's own ``exp`` claim.
+    """
+    key = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+    decoded_token = _token_cache.get(key)
+    if decoded_token is not None:
+        return decoded_token
+
+    loop = asyncio.get_running_loop()
+    decoded_token = await loop.run_in_executor(_verify_executor, verify_token, id_token)
+
+    ttl = min(TOKEN_CACHE_TTL, decoded_token.get("exp", 0) - time.time())
+    _token_cache.set(key, decoded_token, ttl)
+    return decoded_token
+
+def prefetch_public_keys():
+    """Fetch Google's ID token signing certificates into the SDK's HTTP cache."""
+    from firebase_admin import _token_gen
+    client = auth._get_client(None)
+    client._token_verifier.request(url=_token_gen.ID_TOKEN_CERT_URI, method="GET")
+
+async def refresh_public_keys_periodically():
+    """Keep the signing certificates warm so verification never waits on a fetch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(_verify_executor, prefetch_public_keys)
+        except Exception as e:
+            print(f"Error prefetching Firebase public keys: {e}")
+        await asyncio.sleep(FIREBASE_CERT_REFRESH_INTERVAL)
+
 def get_user_by_uid(uid: str) -> Optional[Dict[str, Any]]:
     """Get user by Firebase UID."""
     try:
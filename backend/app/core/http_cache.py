@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Cache-Control policies for conditional read endpoints
+HTTP_CACHE_PUBLIC_MAX_AGE = int(os.getenv("HTTP_CACHE_PUBLIC_MAX_AGE", "60"))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "300"))
+
+PUBLIC_CACHE_CONTROL = (
+    f"public, max-age={HTTP_CACHE_PUBLIC_MAX_AGE}, "
+    f"stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+)
+# Access-checked documents: browsers revalidate every time, shared caches never store
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def _version_value(value):
+    # Lists are versioned by length, e.g. members or applicants
+    return len(value) if isinstance(value, list) else value
+
+
+def entity_tag(doc: dict, *version_fields: str) -> str:
+    """Weak ETag for a document from its id, updatedAt and counter fields.
+
+    Documents without an updatedAt are tagged by their full contents.
+    """
+    if doc.get("updatedAt") is None:
+        basis = doc
+    else:
+        basis = [doc.get("_id"), doc.get("updatedAt")] + [_version_value(doc.get(field)) for field in version_fields]
+    digest = hashlib.sha1(json.dumps(basis, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def last_modified(doc: dict) -> Optional[datetime]:
+    value = doc.get("updatedAt") or doc.get("createdAt")
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision
+    return value.replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified <= since
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, modified: Optional[datetime], cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if modified is not None:
+        response.headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    doc: dict,
+    cache_control: str,
+    *version_fields: str
+) -> Optional[Response]:
+    """Set validators for ``doc`` and return a 304 if the client's copy is current.
+
+    Returns None when the full body should be sent.
+    """
+    etag = entity_tag(doc, *version_fields)
+    modified = last_modified(doc)
+    if is_not_modified(request, etag, modified):
+        not_modified = Response(status_code=304)
+        set_cache_headers(not_modified, etag, modified, cache_control)
+        return not_modified
+    set_cache_headers(response, etag, modified, cache_control)
+    return None
@@ -0,0 +1,191 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from app.core.uploads import UPLOAD_DIR, is_content_hash
+
+# Resized variants of uploaded images, rendered off the event loop
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_VARIANT_WIDTHS = {
+    "avatar": int(os.getenv("IMAGE_AVATAR_WIDTH", "96")),
+    "thumb": int(os.getenv("IMAGE_THUMB_WIDTH", "320")),
+    "feed": int(os.getenv("IMAGE_FEED_WIDTH", "720")),
+}
+IMAGE_PREGENERATE = os.getenv("IMAGE_PREGENERATE", "true").lower() == "true"
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "82"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+DERIVED_DIR = "derived"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight: Dict[str, asyncio.Future] = {}
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def is_image(extension: str) -> bool:
+    return extension in IMAGE_EXTENSIONS
+
+
+def variant_widths() -> list:
+    return sorted(set(IMAGE_VARIANT_WIDTHS.values()))
+
+
+def snap_width(requested: int) -> int:
+    """Round a requested width up to a configured variant so the cache stays bounded."""
+    widths = variant_widths()
+    for width in widths:
+        if width >= requested:
+            return width
+    return widths[-1]
+
+
+def variant_urls(name: str) -> dict:
+    return {variant: f"/uploads/{name}?w={width}" for variant, width in IMAGE_VARIANT_WIDTHS.items()}
+
+
+def derivative_name(content_hash: str, width: int, extension: str) -> str:
+    """Relative path of a derivative; width 0 keeps the original size."""
+    suffix = f"_w{width}" if width else ""
+    return f"{DERIVED_DIR}/{content_hash}{suffix}{extension}"
+
+
+def find_image_blob(content_hash: str) -> Optional[str]:
+    """Stored file name of an image blob addressed by its bare hash."""
+    for extension in IMAGE_EXTENSIONS:
+        name = content_hash + extension
+        if os.path.isfile(os.path.join(UPLOAD_DIR, name)):
+            return name
+    return None
+
+
+def render_derivative(source_path: str, dest_path: str, width: int, quality: int) -> None:
+    """Resize an image to at most ``width`` pixels wide (0 for no limit) and save it to dest_path.
+
+    Runs in a worker process; the output format follows dest_path's extension.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if width and image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        extension = os.path.splitext(dest_path)[1]
+        if extension == ".webp":
+            options = {"format": "WEBP", "quality": quality, "method": 4}
+        elif extension in (".jpg", ".jpeg"):
+            image = image.convert("RGB")
+            options = {"format": "JPEG", "quality": quality, "optimize": True, "progressive": True}
+        else:
+            options = {"format": "PNG", "optimize": True}
+
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        image.save(tmp_path, **options)
+    os.replace(tmp_path, dest_path)
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned workers don't inherit the server's threads and connections
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def ensure_derivative(name: str, width: int, as_webp: bool) -> str:
+    """Render a derivative of an upload if it isn't cached yet; returns its relative path."""
+    content_hash, extension = os.path.splitext(name)
+    derived = derivative_name(content_hash, width, ".webp" if as_webp else extension)
+    dest_path = os.path.join(UPLOAD_DIR, derived)
+    if os.path.exists(dest_path):
+        return derived
+
+    # Concurrent requests for the same derivative share one render
+    future = _in_flight.get(dest_path)
+    if future is None:
+        os.makedirs(os.path.join(UPLOAD_DIR, DERIVED_DIR), exist_ok=True)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            get_image_pool(), render_derivative,
+            os.path.join(UPLOAD_DIR, name), dest_path, width, IMAGE_QUALITY
+        )
+        _in_flight[dest_path] = future
+        future.add_done_callback(lambda _: _in_flight.pop(dest_path, None))
+    try:
+        await asyncio.shield(future)
+    except BrokenProcessPool:
+        # A crashed worker poisons the pool; start a fresh one next time
+        shutdown_image_pool()
+        raise
+    return derived
+
+
+async def generate_variants(name: str):
+    """Pre-render every configured width in the original format and WebP."""
+    for width in variant_widths():
+        for as_webp in (False, True):
+            try:
+                await ensure_derivative(name, width, as_webp)
+            except Exception as e:
+                print(f"Error rendering {width}px variant of {name}: {e}")
+                return
+
+
+def schedule_variants(name: str):
+    """Start pre-rendering an image's variants in the background."""
+    if not IMAGE_PREGENERATE:
+        return
+    task = asyncio.create_task(generate_variants(name))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+class UploadStaticFiles(StaticFiles):
+    """Serves uploads, resolving ``?w=<px>[&format=webp]`` to a cached derivative.
+
+    Images may also be addressed by their bare content hash.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        width = query.get("w", [None])[0]
+        as_webp = query.get("format", [""])[0].lower() == "webp"
+
+        name = path
+        if is_content_hash(path):
+            name = find_image_blob(path)
+            if name is None:
+                raise HTTPException(status_code=404)
+
+        if width is None and not as_webp:
+            return await super().get_response(name, scope)
+
+        if "/" in name or not is_image(os.path.splitext(name)[1]):
+            raise HTTPException(status_code=404)
+        if not os.path.isfile(os.path.join(UPLOAD_DIR, name)):
+            raise HTTPException(status_code=404)
+        if width is not None and not width.isdigit():
+            raise HTTPException(status_code=400)
+
+        size = snap_width(int(width)) if width is not None else 0
+        try:
+            derived = await ensure_derivative(name, size, as_webp)
+        except Exception as e:
+            print(f"Error rendering {size}px variant of {name}: {e}")
+            raise HTTPException(status_code=415)
+        return await super().get_response(derived, scope)
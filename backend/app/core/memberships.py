@@ -0,0 +1,37 @@
+import os
+from typing import Any
+from bson import ObjectId
+from app.core.cache import TTLCache
+from app.database.mongo import db
+
+# Cached membership answers, keyed by (collection, document id, user id)
+MEMBERSHIP_CACHE_SIZE = int(os.getenv("MEMBERSHIP_CACHE_SIZE", "50000"))
+MEMBERSHIP_CACHE_TTL = int(os.getenv("MEMBERSHIP_CACHE_TTL", "300"))
+# Negative answers expire sooner so joins made on other workers show up quickly
+MEMBERSHIP_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_NEGATIVE_TTL", "10"))
+
+_memberships = TTLCache(maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_CACHE_TTL)
+
+def _membership_key(collection_name: str, doc_id: ObjectId, user_id: Any) -> tuple:
+    return (collection_name, str(doc_id), str(user_id))
+
+async def is_member(collection_name: str, doc_id: ObjectId, user_id: Any) -> bool:
+    """Check whether user_id is in the ``members`` array of a pod or room.
+
+    Matches on ``{_id, members}`` and projects only the id, so the member
+    list never leaves the database. Answers are cached per process.
+    """
+    key = _membership_key(collection_name, doc_id, user_id)
+    cached = _memberships.get(key)
+    if cached is not None:
+        return cached
+
+    match = await getattr(db, collection_name).find_one({"_id": doc_id, "members": user_id}, {"_id": 1})
+    member = match is not None
+    _memberships.set(key, member, None if member else MEMBERSHIP_NEGATIVE_TTL)
+    return member
+
+def remember_membership(collection_name: str, doc_id: ObjectId, user_id: Any, member: bool = True):
+    """Record a membership change made by this process, e.g. after a join."""
+    key = _membership_key(collection_name, doc_id, user_id)
+    _memberships.set(key, member, None if member else MEMBERSHIP_NEGATIVE_TTL)
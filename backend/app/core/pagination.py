@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException, Query, status
+
+# Newest-first ordering shared by every list endpoint; _id breaks createdAt ties
+SORT_NEWEST_FIRST = [("createdAt", -1), ("_id", -1)]
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Build an opaque cursor pointing just after ``doc``."""
+    created_at = doc.get("createdAt")
+    payload = {
+        "t": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "id": str(doc["_id"])
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """Decode a cursor into its (createdAt, _id) position.
+
+    Raises ValueError for anything that was not produced by encode_cursor.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        created_at = datetime.fromisoformat(payload["t"]) if payload["t"] is not None else None
+        doc_id = ObjectId(payload["id"]) if ObjectId.is_valid(payload["id"]) else payload["id"]
+        return created_at, doc_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def is_valid_cursor(cursor: str) -> bool:
+    """Check that a client-supplied cursor can be decoded."""
+    try:
+        decode_cursor(cursor)
+        return True
+    except ValueError:
+        return False
+
+
+def valid_cursor(cursor: Optional[str] = Query(None)) -> Optional[str]:
+    """``cursor`` query parameter of list endpoints; 400 unless it can be decoded."""
+    if cursor and not is_valid_cursor(cursor):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return cursor
+
+
+def keyset_filter(created_at: Optional[datetime], doc_id: Any, op: str = "$lt") -> Dict[str, Any]:
+    """Match documents strictly before (``$lt``) or after (``$gt``) a position."""
+    if created_at is None:
+        return {"createdAt": None, "_id": {op: doc_id}}
+    return {"$or": [
+        {"createdAt": {op: created_at}},
+        {"createdAt": created_at, "_id": {op: doc_id}}
+    ]}
+
+
+def apply_cursor(filter_query: Dict[str, Any], cursor: str) -> Dict[str, Any]:
+    """Restrict a newest-first query to documents after the cursor position."""
+    created_at, doc_id = decode_cursor(cursor)
+    keyset = keyset_filter(created_at, doc_id, "$lt")
+    if not filter_query:
+        return keyset
+    return {"$and": [filter_query, keyset]}
+
+
+def paginate(
+    collection,
+    filter_query: Dict[str, Any],
+    skip: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+):
+    """Return a Motor cursor for one newest-first page.
+
+    With a ``cursor`` the page is found by keyset on (createdAt, _id) and
+    ``skip`` is ignored, so deep pages cost the same as the first one. A
+    ``projection`` must keep createdAt for next_cursor to work.
+    """
+    if cursor:
+        return collection.find(apply_cursor(filter_query, cursor), projection).sort(SORT_NEWEST_FIRST).limit(limit)
+    return collection.find(filter_query, projection).sort(SORT_NEWEST_FIRST).skip(skip).limit(limit)
+
+
+def next_cursor(docs: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor for the page after ``docs``, or None when this was the last page."""
+    if len(docs) < limit:
+        return None
+    return encode_cursor(docs[-1])
@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+# Fields exposed by the public profile endpoints, with their defaults
+PUBLIC_PROFILE_DEFAULTS = {
+    "displayName": None,
+    "photoURL": None,
+    "bio": None,
+    "location": None,
+    "skills": [],
+    "interests": [],
+    "experience": None,
+    "role": None,
+    "rating": 0.0,
+    "completedProjects": 0,
+    "joinDate": None,
+}
+
+# Applied in the query so private fields (activityLog, appliedGigs, ...) never
+# leave MongoDB; createdAt/updatedAt are kept for cursors and ETags
+PUBLIC_PROFILE_PROJECTION = {
+    field: 1 for field in ("_id", "createdAt", "updatedAt", *PUBLIC_PROFILE_DEFAULTS)
+}
+
+
+def to_public_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a (projected) user document as a public profile."""
+    profile = {"id": str(user["_id"])}
+    for field, default in PUBLIC_PROFILE_DEFAULTS.items():
+        profile[field] = user.get(field, list(default) if isinstance(default, list) else default)
+    return profile
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional, Set
+from app.core.responses import dumps
+from app.database.redis import get_redis
+
+# Per-subscriber queue bound; a subscriber that falls this far behind is dropped
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+REDIS_CHANNEL_PREFIX = "earnbuddy:"
+# Backoff bounds (seconds) for reconnecting the Redis listener
+REDIS_RECONNECT_MIN_DELAY = 0.5
+REDIS_RECONNECT_MAX_DELAY = 30
+
+_CLOSED = object()
+
+
+class Subscription:
+    """A subscriber's bounded queue of messages for one channel."""
+
+    def __init__(self, hub: "MessageHub", channel: str, maxsize: int):
+        self.hub = hub
+        self.channel = channel
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: Any):
+        """Enqueue without waiting; overflow closes the subscription."""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    async def get(self) -> Optional[Any]:
+        """Wait for the next message, or None once the subscription is closed."""
+        message = await self._queue.get()
+        return None if message is _CLOSED else message
+
+    def close(self):
+        self.hub.unsubscribe(self)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+
+class MessageHub:
+    """In-process publish/subscribe fan-out.
+
+    Publishing never awaits a subscriber, so one slow consumer cannot stall
+    delivery to the others: it overflows its own queue and is dropped.
+    """
+
+    def __init__(self, queue_size: int = PUBSUB_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, self.queue_size)
+        self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+    def _deliver_local(self, channel: str, message: Any):
+        for subscription in list(self._channels.get(channel, ())):
+            subscription.deliver(message)
+
+    async def publish(self, channel: str, message: Any):
+        """Fan a message out to subscribers; best effort, never raises."""
+        self._deliver_local(channel, message)
+
+    async def start(self):
+        """Start any background work the hub needs."""
+
+    async def close(self):
+        for subscribers in list(self._channels.values()):
+            for subscription in list(subscribers):
+                subscription.close()
+
+
+class RedisMessageHub(MessageHub):
+    """Fan-out across workers through Redis pub/sub.
+
+    Publishes go to Redis only; a listener task receives every channel
+    and delivers to this worker's local subscribers. Messages are
+    JSON-encoded on the way through, so ObjectIds and datetimes arrive
+    as strings.
+
+    The listener reconnects with exponential backoff when Redis drops;
+    messages published while it is disconnected are not replayed, so
+    clients catch up through the history endpoints (``after=``).
+    """
+
+    def __init__(self, redis, queue_size: int = PUBSUB_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.redis = redis
+        self._listener: Optional[asyncio.Task] = None
+        self._reconnect_delay = REDIS_RECONNECT_MIN_DELAY
+
+    async def publish(self, channel: str, message: Any):
+        try:
+            await self.redis.publish(REDIS_CHANNEL_PREFIX + channel, dumps(message))
+        except Exception as e:
+            # The message is already stored; at least reach this worker's subscribers
+            print(f"Error publishing to Redis on {channel}: {e}")
+            self._deliver_local(channel, json.loads(dumps(message)))
+
+    async def _listen_once(self):
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+            self._reconnect_delay = REDIS_RECONNECT_MIN_DELAY
+            async for event in pubsub.listen():
+                if event.get("type") != "pmessage":
+                    continue
+                channel = event["channel"][len(REDIS_CHANNEL_PREFIX):]
+                try:
+                    self._deliver_local(channel, json.loads(event["data"]))
+                except Exception as e:
+                    print(f"Error delivering pub/sub message on {channel}: {e}")
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def _listen(self):
+        while True:
+            try:
+                await self._listen_once()
+                print("Redis pub/sub connection closed")
+            except Exception as e:
+                print(f"Error in Redis pub/sub listener: {e}")
+            print(f"Reconnecting to Redis pub/sub in {self._reconnect_delay}s")
+            await asyncio.sleep(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, REDIS_RECONNECT_MAX_DELAY)
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await super().close()
+
+
+def create_hub() -> MessageHub:
+    """Use Redis pub/sub when REDIS_URL is set, otherwise in-process fan-out."""
+    redis = get_redis()
+    if redis is not None:
+        return RedisMessageHub(redis)
+    return MessageHub()
+
+
+hub = create_hub()
@@ -0,0 +1,154 @@
+import json
+import os
+from collections import OrderedDict, deque
+from typing import List, Optional
+from app.database.redis import REDIS_URL
+
+# Hot-room ring buffers; disabled by default when Redis fans messages out
+# across workers, since each worker would only see its own writes
+RECENT_MESSAGES_ENABLED = os.getenv("RECENT_MESSAGES_ENABLED", "false" if REDIS_URL else "true").lower() == "true"
+RECENT_MESSAGES_PER_ROOM = int(os.getenv("RECENT_MESSAGES_PER_ROOM", "50"))
+RECENT_MESSAGES_MEMORY_BUDGET = int(os.getenv("RECENT_MESSAGES_MEMORY_BUDGET", str(16 * 1024 * 1024)))
+
+
+def _message_size(message: dict) -> int:
+    return len(json.dumps(message, default=str))
+
+
+class _RoomBuffer:
+    def __init__(self):
+        self.messages: deque = deque()
+        self.sizes: deque = deque()
+        self.bytes = 0
+        # True while the buffer holds the room's entire history
+        self.complete = True
+        # Set between reserve() and warm(); sends meanwhile are held in pending
+        self.loading = False
+        self.pending: List[dict] = []
+
+
+class RecentMessageBuffer:
+    """Per-room ring buffers of the newest messages, kept in process memory.
+
+    A room is warmed on its first read and then kept current by appends
+    from the write path; appends to cold rooms are ignored so a buffer is
+    never mistaken for the room's latest messages when it is not. Rooms
+    are evicted least-recently-used once the approximate JSON size of all
+    buffered messages exceeds the memory budget. When disabled, every
+    read misses and writes are ignored.
+    """
+
+    def __init__(
+        self,
+        per_room: int = RECENT_MESSAGES_PER_ROOM,
+        memory_budget: int = RECENT_MESSAGES_MEMORY_BUDGET,
+        enabled: bool = RECENT_MESSAGES_ENABLED
+    ):
+        self.enabled = enabled
+        self.per_room = per_room
+        self.memory_budget = memory_budget
+        self.bytes = 0
+        self._rooms: "OrderedDict[str, _RoomBuffer]" = OrderedDict()
+
+    def is_warm(self, room_key: str) -> bool:
+        buffer = self._rooms.get(room_key)
+        return buffer is not None and not buffer.loading
+
+    def reserve(self, room_key: str) -> bool:
+        """Start warming a cold room; returns False if there is nothing to do.
+
+        Call before reading the room from storage so that messages sent
+        while the read is in flight are not lost.
+        """
+        if not self.enabled or room_key in self._rooms:
+            return False
+        buffer = _RoomBuffer()
+        buffer.loading = True
+        self._rooms[room_key] = buffer
+        return True
+
+    def warm(self, room_key: str, messages: List[dict]):
+        """Load a reserved room with its newest messages, oldest first."""
+        buffer = self._rooms.get(room_key)
+        if buffer is None or not buffer.loading:
+            return
+        loaded_ids = {str(message.get("_id")) for message in messages}
+        pending = [message for message in buffer.pending if str(message.get("_id")) not in loaded_ids]
+        buffer.loading = False
+        buffer.pending = []
+        buffer.complete = len(messages) < self.per_room
+        for message in messages[-self.per_room:] + pending:
+            self._push(buffer, message)
+        self._enforce_budget(room_key)
+
+    def append(self, room_key: str, message: dict):
+        """Record a newly sent message if the room is warm or warming."""
+        buffer = self._rooms.get(room_key)
+        if buffer is None:
+            return
+        if buffer.loading:
+            buffer.pending.append(message)
+            return
+        self._push(buffer, message)
+        self._rooms.move_to_end(room_key)
+        self._enforce_budget(room_key)
+
+    def latest(self, room_key: str, limit: int) -> Optional[List[dict]]:
+        """Newest ``limit`` messages, newest first, or None if the buffer can't answer."""
+        buffer = self._rooms.get(room_key)
+        if buffer is None or buffer.loading or (limit > len(buffer.messages) and not buffer.complete):
+            return None
+        self._rooms.move_to_end(room_key)
+        messages = list(buffer.messages)[-limit:]
+        messages.reverse()
+        return messages
+
+    def after(self, room_key: str, message_id: str, limit: int) -> Optional[List[dict]]:
+        """Messages sent after ``message_id``, oldest first, or None if it is not buffered."""
+        buffer = self._rooms.get(room_key)
+        if buffer is None or buffer.loading:
+            return None
+        messages = list(buffer.messages)
+        for index in range(len(messages) - 1, -1, -1):
+            if str(messages[index].get("_id")) == message_id:
+                self._rooms.move_to_end(room_key)
+                return messages[index + 1:index + 1 + limit]
+        return None
+
+    def evict(self, room_key: str):
+        buffer = self._rooms.pop(room_key, None)
+        if buffer is not None:
+            self.bytes -= buffer.bytes
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rooms": len(self._rooms),
+            "messages": sum(len(buffer.messages) for buffer in self._rooms.values()),
+            "bytes": self.bytes,
+            "memoryBudget": self.memory_budget
+        }
+
+    def _push(self, buffer: _RoomBuffer, message: dict):
+        size = _message_size(message)
+        buffer.messages.append(message)
+        buffer.sizes.append(size)
+        buffer.bytes += size
+        self.bytes += size
+        while len(buffer.messages) > self.per_room:
+            buffer.messages.popleft()
+            dropped = buffer.sizes.popleft()
+            buffer.bytes -= dropped
+            self.bytes -= dropped
+            buffer.complete = False
+
+    def _enforce_budget(self, keep: str):
+        while self.bytes > self.memory_budget and len(self._rooms) > 1:
+            room_key = next(iter(self._rooms))
+            if room_key == keep:
+                self._rooms.move_to_end(room_key)
+                continue
+            self.evict(room_key)
+
+
+recent_messages = RecentMessageBuffer()
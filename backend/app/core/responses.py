@@ -0,0 +1,102 @@
+import functools
+import inspect
+from typing import Any, Callable
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+_SUB_RESPONSE_PARAM = "_bson_sub_response"
+
+
+def bson_default(value: Any) -> Any:
+    """orjson fallback for the BSON and pydantic types routes return."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    # Mongo documents can carry ObjectId keys, e.g. reactions keyed by user
+    return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class BSONJSONResponse(JSONResponse):
+    """JSON response rendered by orjson with native ObjectId/datetime support."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _wrap_endpoint(endpoint: Callable, status_code: int) -> Callable:
+    """Render plain return values with BSONJSONResponse instead of jsonable_encoder.
+
+    FastAPI only skips its recursive encoder when an endpoint returns a
+    Response, so the wrapper does that, carrying over the status code and
+    headers routes set on their injected ``response``.
+    """
+    signature = inspect.signature(endpoint)
+    is_coroutine = inspect.iscoroutinefunction(endpoint)
+
+    # FastAPI injects the sub-response into one parameter only, so reuse the
+    # endpoint's own ``response: Response`` when it has one
+    response_param = next(
+        (name for name, param in signature.parameters.items() if param.annotation is Response),
+        None
+    )
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        if response_param:
+            sub_response: Response = kwargs[response_param]
+        else:
+            sub_response = kwargs.pop(_SUB_RESPONSE_PARAM)
+        if is_coroutine:
+            result = await endpoint(*args, **kwargs)
+        else:
+            result = await run_in_threadpool(endpoint, *args, **kwargs)
+        if isinstance(result, Response):
+            return result
+
+        response = BSONJSONResponse(result, status_code=sub_response.status_code or status_code)
+        response.raw_headers.extend(
+            header for header in sub_response.raw_headers if header[0] != b"content-length"
+        )
+        return response
+
+    if not response_param:
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_SUB_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+        ])
+    return wrapper
+
+
+class BSONRoute(APIRoute):
+    """API route whose responses are serialized by BSONJSONResponse.
+
+    Routes with a response model (explicit or from a return annotation)
+    keep FastAPI's validation path.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = response_model.value
+        has_return_model = inspect.signature(endpoint).return_annotation is not inspect.Signature.empty
+        if response_model is None and not has_return_model and inspect.isfunction(endpoint):
+            endpoint = _wrap_endpoint(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import os
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import TEXT
+from app.core.profiles import PUBLIC_PROFILE_PROJECTION, to_public_profile
+from app.core.totals import get_total
+from app.database.community_posts import COMMUNITY_POST_TEXT_WEIGHTS, CommunityPostStore
+from app.database.mongo import db
+
+# Deepest match reachable with skip + limit; every searched type reads this many at most
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "500"))
+# Stemming and stop words of the MongoDB text indexes
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "english")
+
+SEARCH_INDEX_NAME = "search_text"
+
+# Searchable types: collection, text index weights and which documents are visible
+SEARCH_SOURCES: Dict[str, Dict[str, Any]] = {
+    "projects": {
+        "collection": "projects",
+        "weights": {"title": 10, "skills": 5, "description": 1},
+    },
+    "pods": {
+        "collection": "pods",
+        "weights": {"name": 10, "tags": 5, "description": 1},
+        "filter": {"isPrivate": False},
+    },
+    "posts": {
+        "collection": "posts",
+        "weights": {"title": 10, "content": 1},
+    },
+    "users": {
+        "collection": "users",
+        "weights": {"displayName": 10, "skills": 5, "bio": 1},
+        "projection": PUBLIC_PROFILE_PROJECTION,
+    },
+}
+COMMUNITY_POSTS_TYPE = "communityPosts"
+SEARCH_TYPES = (*SEARCH_SOURCES, COMMUNITY_POSTS_TYPE)
+
+Match = Tuple[float, Dict[str, Any]]
+
+
+async def create_search_indexes():
+    """Create the weighted text index behind each searchable collection."""
+    text_indexes = [(source["collection"], source["weights"]) for source in SEARCH_SOURCES.values()]
+    text_indexes.append(("communityPosts", COMMUNITY_POST_TEXT_WEIGHTS))
+    for collection_name, weights in text_indexes:
+        await getattr(db, collection_name).create_index(
+            [(field, TEXT) for field in weights],
+            weights=weights,
+            default_language=SEARCH_LANGUAGE,
+            name=SEARCH_INDEX_NAME
+        )
+
+
+async def _search_collection(
+    search_type: str,
+    query: str,
+    limit: int,
+    include_total: bool
+) -> Tuple[List[Match], Optional[int]]:
+    source = SEARCH_SOURCES[search_type]
+    collection = getattr(db, source["collection"])
+    filter_query = {"$text": {"$search": query}, **source.get("filter", {})}
+    matches = []
+    if limit:
+        projection = dict(source.get("projection") or {}, score={"$meta": "textScore"})
+        cursor = collection.find(filter_query, projection).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        async for doc in cursor:
+            score = doc.pop("score")
+            matches.append((score, to_public_profile(doc) if search_type == "users" else doc))
+    total = await get_total(collection, filter_query, include_total)
+    return matches, total
+
+
+def _normalized(matches: List[Match]) -> List[Match]:
+    """Scale a best-first run so its top match scores 1.
+
+    Text scores depend on each index's weights and document lengths, and
+    BM25 scores of the in-memory index are on another scale again, so raw
+    scores cannot be compared across types. Relative to the best match of
+    its own type, a score says how close a match comes to that type's top.
+    """
+    if not matches or matches[0][0] <= 0:
+        return matches
+    top = matches[0][0]
+    return [(score / top, doc) for score, doc in matches]
+
+
+async def search(
+    query: str,
+    types: List[str],
+    skip: int,
+    limit: int,
+    community_posts: CommunityPostStore,
+    include_facets: bool = True
+) -> Dict[str, Any]:
+    """Rank matches across types by relevance and return one page of them.
+
+    Each type is read best first, up to skip + limit matches, concurrently;
+    the runs are merged by score, normalized per type to the type's best
+    match, so the top result of every searched type scores 1. Facets count the matches of every type,
+    searched or not, so clients can show per-type tabs.
+    """
+    window = skip + limit
+
+    async def search_type(search_type: str) -> Tuple[List[Match], Optional[int]]:
+        type_limit = window if search_type in types else 0
+        if search_type == COMMUNITY_POSTS_TYPE:
+            return await community_posts.search(query, type_limit, include_facets)
+        return await _search_collection(search_type, query, type_limit, include_facets)
+
+    searched = [search_type for search_type in SEARCH_TYPES if search_type in types or include_facets]
+    outcomes = await asyncio.gather(*(search_type(name) for name in searched))
+
+    runs = [
+        [{"type": name, "score": score, "data": doc} for score, doc in _normalized(matches)]
+        for name, (matches, _) in zip(searched, outcomes)
+    ]
+    merged = heapq.merge(*runs, key=lambda result: result["score"], reverse=True)
+    results = list(islice(merged, skip, window))
+
+    facets = None
+    total = None
+    if include_facets:
+        facets = {name: count for name, (_, count) in zip(searched, outcomes)}
+        total = sum(facets[name] for name in types)
+    return {"results": results, "facets": facets, "total": total}
@@ -0,0 +1,105 @@
+import jwt
+import os
+import time
+import uuid
+from typing import Any, Dict
+from bson import ObjectId
+from app.core.cache import TTLCache
+from app.database.redis import get_redis
+
+# Opt-in session tokens issued by /api/auth/verify
+SESSION_TOKENS_ENABLED = os.getenv("SESSION_TOKENS_ENABLED", "false").lower() == "true"
+SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET", "")
+SESSION_TOKEN_TTL = int(os.getenv("SESSION_TOKEN_TTL", "900"))
+SESSION_REFRESH_WINDOW = int(os.getenv("SESSION_REFRESH_WINDOW", "86400"))
+SESSION_TOKEN_ALGORITHM = "HS256"
+SESSION_TOKEN_ISSUER = "earnbuddy"
+REVOKED_KEY_PREFIX = "session:revoked:"
+
+# Token ids that were refreshed or logged out, kept until the token can no
+# longer be refreshed. With Redis this is only a local fast path for
+# rejecting access; Redis is the shared record that makes refresh
+# single-use across workers and restarts. Without Redis it is the only
+# record, so session tokens then need a single worker.
+_revoked = TTLCache(maxsize=100000, ttl=SESSION_TOKEN_TTL + SESSION_REFRESH_WINDOW)
+
+def sessions_enabled() -> bool:
+    """Whether session tokens are switched on and a signing secret is configured."""
+    return SESSION_TOKENS_ENABLED and bool(SESSION_TOKEN_SECRET)
+
+def is_session_token(token: str) -> bool:
+    """Tell our HMAC session tokens apart from Firebase ID tokens (RS256)."""
+    try:
+        return jwt.get_unverified_header(token).get("alg") == SESSION_TOKEN_ALGORITHM
+    except jwt.PyJWTError:
+        return False
+
+def issue_session_token(user: Dict[str, Any]) -> str:
+    """Sign a short-lived session token for a user document or principal."""
+    now = int(time.time())
+    claims = {
+        "sub": str(user["_id"]),
+        "uid": user.get("uid"),
+        "role": user.get("role", "builder"),
+        "name": user.get("displayName", "Anonymous"),
+        "email": user.get("email"),
+        "picture": user.get("photoURL"),
+        "onboarded": user.get("onboardingCompleted", False),
+        "iss": SESSION_TOKEN_ISSUER,
+        "iat": now,
+        "exp": now + SESSION_TOKEN_TTL,
+        "jti": uuid.uuid4().hex
+    }
+    return jwt.encode(claims, SESSION_TOKEN_SECRET, algorithm=SESSION_TOKEN_ALGORITHM)
+
+def decode_session_token(token: str, allow_expired: bool = False) -> Dict[str, Any]:
+    """Validate a session token's signature and claims without any I/O.
+
+    With ``allow_expired`` an expired token is still accepted for up to
+    SESSION_REFRESH_WINDOW seconds, which is how refresh works.
+    """
+    claims = jwt.decode(
+        token,
+        SESSION_TOKEN_SECRET,
+        algorithms=[SESSION_TOKEN_ALGORITHM],
+        issuer=SESSION_TOKEN_ISSUER,
+        options={"verify_exp": not allow_expired, "require": ["exp", "jti", "sub"]}
+    )
+    if allow_expired and claims["exp"] + SESSION_REFRESH_WINDOW < time.time():
+        raise jwt.ExpiredSignatureError("Session token is too old to refresh")
+    if claims["jti"] in _revoked:
+        raise jwt.InvalidTokenError("Session token has been revoked")
+    return claims
+
+async def claim_session_token(claims: Dict[str, Any]) -> bool:
+    """Atomically mark a token id as used, until it could no longer be refreshed.
+
+    Returns False if the token was already refreshed or revoked, so only
+    one of several concurrent refreshes of the same token succeeds. Uses
+    ``SET NX`` in Redis when configured.
+    """
+    jti = claims["jti"]
+    ttl = max(1, int(claims["exp"] + SESSION_REFRESH_WINDOW - time.time()) + 1)
+    redis = get_redis()
+    if redis is not None:
+        claimed = await redis.set(REVOKED_KEY_PREFIX + jti, "1", nx=True, ex=ttl)
+        _revoked.set(jti, True, ttl)
+        return bool(claimed)
+
+    # No await between the check and the set, so this is atomic within the process
+    if jti in _revoked:
+        return False
+    _revoked.set(jti, True, ttl)
+    return True
+
+def principal_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a user principal from session token claims, with every ``PRINCIPAL_FIELDS`` entry."""
+    return {
+        "_id": ObjectId(claims["sub"]),
+        "uid": claims.get("uid"),
+        "email": claims.get("email"),
+        "displayName": claims.get("name", "Anonymous"),
+        "photoURL": claims.get("picture"),
+        "role": claims.get("role"),
+        "onboardingCompleted": claims.get("onboarded", False)
+    }
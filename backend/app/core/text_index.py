@@ -0,0 +1,103 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Matches the spirit of MongoDB's English text index: common words are not indexed
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its of on or our so that the their
+this to was we were will with you your
+""".split())
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def _stem(token: str) -> str:
+    # Plural folding only, so "designers" finds "designer"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed terms of text, without stop words."""
+    return [
+        _stem(token) for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+class InvertedIndex:
+    """In-memory inverted index ranked with BM25.
+
+    Each document's fields are tokenized with per-field weights, so a
+    term in a heavily weighted field counts as that many occurrences. A
+    query matches documents containing any of its terms; documents with
+    more and rarer terms rank first.
+    """
+
+    def __init__(self, weights: Dict[str, int]):
+        self.weights = weights
+        # term -> doc id -> weighted term frequency
+        self.postings: Dict[str, Dict[Any, int]] = {}
+        self.lengths: Dict[Any, int] = {}
+        self.doc_terms: Dict[Any, Tuple[str, ...]] = {}
+        self.total_length = 0
+
+    def _terms(self, doc: Dict[str, Any]) -> Counter:
+        terms: Counter = Counter()
+        for field, weight in self.weights.items():
+            value = doc.get(field)
+            if not value:
+                continue
+            text = " ".join(map(str, value)) if isinstance(value, list) else str(value)
+            for term in tokenize(text):
+                terms[term] += weight
+        return terms
+
+    def add(self, doc_id: Any, doc: Dict[str, Any]):
+        if doc_id in self.lengths:
+            self.remove(doc_id)
+        terms = self._terms(doc)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.doc_terms[doc_id] = tuple(terms)
+        self.total_length += length
+
+    def remove(self, doc_id: Any):
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            documents = self.postings[term]
+            del documents[doc_id]
+            if not documents:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int) -> Tuple[List[Tuple[float, Any]], int]:
+        """The best ``limit`` (score, doc id) pairs and the number of matching documents."""
+        count = len(self.lengths)
+        if not count:
+            return [], 0
+        average_length = self.total_length / count or 1
+        scores: Dict[Any, float] = {}
+        for term in set(tokenize(query)):
+            documents = self.postings.get(term)
+            if not documents:
+                continue
+            idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+            for doc_id, frequency in documents.items():
+                norm = _K1 * (1 - _B + _B * self.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (_K1 + 1) / (frequency + norm)
+        best = heapq.nlargest(limit, ((score, doc_id) for doc_id, score in scores.items()), key=lambda hit: hit[0])
+        return best, len(scores)
@@ -0,0 +1,44 @@
+import json
+import os
+from typing import Any, Dict, Optional
+from app.core.cache import TTLCache
+
+# Cached list totals, keyed by collection and normalized filter
+TOTALS_CACHE_SIZE = int(os.getenv("TOTALS_CACHE_SIZE", "5000"))
+TOTALS_CACHE_TTL = int(os.getenv("TOTALS_CACHE_TTL", "30"))
+
+_totals = TTLCache(maxsize=TOTALS_CACHE_SIZE, ttl=TOTALS_CACHE_TTL)
+
+def _total_key(collection_name: str, filter_query: Dict[str, Any]) -> str:
+    return collection_name + ":" + json.dumps(filter_query, sort_keys=True, default=str)
+
+async def get_total(collection, filter_query: Dict[str, Any], include_total: bool = True) -> Optional[int]:
+    """Count the documents behind a list response.
+
+    Unfiltered lists use the collection metadata count. Filtered counts
+    are cached for TOTALS_CACHE_TTL seconds per normalized filter.
+    Returns None when the client opted out with ``includeTotal=false``.
+    """
+    if not include_total:
+        return None
+    if not filter_query:
+        return await collection.estimated_document_count()
+
+    key = _total_key(collection.name, filter_query)
+    total = _totals.get(key)
+    if total is None:
+        total = await collection.count_documents(filter_query)
+        _totals.set(key, total)
+    return total
+
+def adjust_total(collection_name: str, filter_query: Dict[str, Any], delta: int):
+    """Apply a known insert/delete to a cached count.
+
+    Keeps hot filters (per pod, per room) exact between refreshes without
+    a recount; the entry still expires on schedule to correct drift from
+    writes made by other workers.
+    """
+    key = _total_key(collection_name, filter_query)
+    total = _totals.get(key)
+    if total is not None:
+        _totals.replace(key, max(0, total + delta))
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+from fastapi import Request
+from app.database.mongo import db
+from app.database.redis import get_redis
+
+# Approximate unique viewers per post/project/pod (HyperLogLog)
+UNIQUE_VIEWERS_PRECISION = int(os.getenv("UNIQUE_VIEWERS_PRECISION", "12"))
+UNIQUE_VIEWERS_MAX_SKETCHES = int(os.getenv("UNIQUE_VIEWERS_MAX_SKETCHES", "2000"))
+UNIQUE_VIEWERS_FLUSH_INTERVAL = float(os.getenv("UNIQUE_VIEWERS_FLUSH_INTERVAL", "30"))
+REDIS_KEY_PREFIX = "viewers:"
+
+_HASH_BITS = 64
+
+
+class HyperLogLog:
+    """HyperLogLog sketch with 2**precision one-byte registers.
+
+    Precision 12 is 4 KB per sketch with a standard error of about 1.6%,
+    however many viewers are added. Merging takes the register-wise
+    maximum, so it is idempotent and order-independent.
+    """
+
+    def __init__(self, precision: int = UNIQUE_VIEWERS_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("Register count does not match precision")
+        self._estimate: Optional[int] = None
+
+    def add(self, value: str) -> bool:
+        """Add a value; returns True if the sketch changed."""
+        hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (_HASH_BITS - self.precision)
+        remainder = hashed & ((1 << (_HASH_BITS - self.precision)) - 1)
+        rank = (_HASH_BITS - self.precision) - remainder.bit_length() + 1
+        if rank <= self.registers[index]:
+            return False
+        self.registers[index] = rank
+        self._estimate = None
+        return True
+
+    def merge(self, registers: bytes) -> bool:
+        """Fold in another sketch's registers; returns True if anything changed."""
+        changed = False
+        for index, rank in enumerate(registers):
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+                changed = True
+        if changed:
+            self._estimate = None
+        return changed
+
+    def count(self) -> int:
+        if self._estimate is None:
+            m = self.size
+            alpha = 0.7213 / (1 + 1.079 / m)
+            raw = alpha * m * m / sum(2.0 ** -rank for rank in self.registers)
+            zeros = self.registers.count(0)
+            if raw <= 2.5 * m and zeros:
+                # Linear counting is more accurate for small cardinalities
+                raw = m * math.log(m / zeros)
+            self._estimate = int(round(raw))
+        return self._estimate
+
+
+def viewer_key(request: Request, current_user: Optional[dict]) -> str:
+    """Identify a viewer by user id, or by client address and user agent when anonymous."""
+    if current_user:
+        return f"user:{current_user['_id']}"
+    host = request.client.host if request.client else ""
+    agent = request.headers.get("user-agent", "")
+    return "anon:" + hashlib.sha1(f"{host}|{agent}".encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("sketch", "dirty", "viewed")
+
+    def __init__(self, sketch: HyperLogLog):
+        self.sketch = sketch
+        self.dirty = False
+        # Viewed since the last flush, so worth refreshing from the stored sketch
+        self.viewed = False
+
+
+class UniqueViewers:
+    """Per-document unique viewer sketches.
+
+    With Redis configured, viewers go straight to PFADD/PFCOUNT. Otherwise
+    sketches live in a bounded LRU in process memory and are merged into
+    the ``viewerSketches`` collection every ``flush_interval`` seconds and
+    on shutdown; evicted sketches with unsaved viewers are written on the
+    next flush. Each flush also merges the stored sketches of documents
+    viewed since the last one back into the cache, so every worker's
+    count converges on the shared value. Counting is best
+    effort: if MongoDB is unavailable, the in-memory estimate is returned.
+    """
+
+    def __init__(
+        self,
+        max_sketches: int = UNIQUE_VIEWERS_MAX_SKETCHES,
+        flush_interval: float = UNIQUE_VIEWERS_FLUSH_INTERVAL
+    ):
+        self.max_sketches = max_sketches
+        self.flush_interval = flush_interval
+        self._sketches: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._evicted: Dict[str, HyperLogLog] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(collection_name: str, doc_id: Any) -> str:
+        return f"{collection_name}:{doc_id}"
+
+    async def _load(self, key: str) -> _Entry:
+        entry = self._sketches.get(key)
+        if entry is not None:
+            self._sketches.move_to_end(key)
+            return entry
+
+        try:
+            stored = await db.viewerSketches.find_one({"_id": key}, {"registers": 1})
+        except Exception as e:
+            # Start from this process's viewers; the next flush merges in the stored ones
+            print(f"Error loading viewer sketch {key}: {e}")
+            stored = None
+        entry = self._sketches.get(key)
+        if entry is None:
+            entry = _Entry(HyperLogLog())
+            pending = self._evicted.pop(key, None)
+            if pending is not None:
+                entry.sketch.merge(pending.registers)
+                entry.dirty = True
+            self._sketches[key] = entry
+            self._evict()
+        if stored and stored.get("registers"):
+            entry.sketch.merge(stored["registers"])
+        return entry
+
+    def _evict(self):
+        while len(self._sketches) > self.max_sketches:
+            key, entry = self._sketches.popitem(last=False)
+            if entry.dirty:
+                self._evicted[key] = entry.sketch
+
+    async def add(self, collection_name: str, doc_id: Any, viewer: str) -> int:
+        """Record a view and return the document's estimated unique viewers."""
+        key = self._key(collection_name, doc_id)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                pipeline = redis.pipeline()
+                pipeline.pfadd(REDIS_KEY_PREFIX + key, viewer)
+                pipeline.pfcount(REDIS_KEY_PREFIX + key)
+                return (await pipeline.execute())[1]
+            except Exception as e:
+                print(f"Error counting unique viewers in Redis: {e}")
+
+        entry = await self._load(key)
+        entry.viewed = True
+        if entry.sketch.add(viewer):
+            entry.dirty = True
+        return entry.sketch.count()
+
+    async def _persist(self, key: str, registers: bytes) -> bytes:
+        """Merge registers into the stored sketch and return the merged registers."""
+        # Read-merge-write; a concurrent writer only means a retry, since merging is idempotent
+        for _ in range(3):
+            stored = await db.viewerSketches.find_one({"_id": key})
+            sketch = HyperLogLog(registers=registers)
+            if stored is None:
+                try:
+                    await db.viewerSketches.insert_one({
+                        "_id": key,
+                        "registers": Binary(bytes(sketch.registers)),
+                        "version": 1,
+                        "updatedAt": datetime.utcnow()
+                    })
+                    return bytes(sketch.registers)
+                except DuplicateKeyError:
+                    continue
+            sketch.merge(stored["registers"])
+            result = await db.viewerSketches.update_one(
+                {"_id": key, "version": stored.get("version", 0)},
+                {
+                    "$set": {"registers": Binary(bytes(sketch.registers)), "updatedAt": datetime.utcnow()},
+                    "$inc": {"version": 1}
+                }
+            )
+            if result.matched_count:
+                return bytes(sketch.registers)
+        raise RuntimeError(f"Conflicting writes to viewer sketch {key}")
+
+    async def flush(self):
+        """Persist every sketch with unsaved viewers."""
+        async with self._flush_lock:
+            self._wake.clear()
+            batch: List[Tuple[str, bytes]] = [
+                (key, bytes(entry.sketch.registers))
+                for key, entry in self._sketches.items() if entry.dirty
+            ]
+            # Viewed without new viewers here: only other workers can have changed them
+            refresh = [key for key, entry in self._sketches.items() if entry.viewed and not entry.dirty]
+            for entry in self._sketches.values():
+                entry.dirty = False
+                entry.viewed = False
+            evicted, self._evicted = self._evicted, {}
+            batch.extend((key, bytes(sketch.registers)) for key, sketch in evicted.items())
+
+            for key, registers in batch:
+                try:
+                    merged = await self._persist(key, registers)
+                except Exception as e:
+                    print(f"Error saving viewer sketch {key}: {e}")
+                    entry = self._sketches.get(key)
+                    if entry is not None:
+                        entry.dirty = True
+                    else:
+                        self._evicted[key] = HyperLogLog(registers=registers)
+                    continue
+                # Pick up other workers' viewers, so every worker's count converges
+                entry = self._sketches.get(key)
+                if entry is not None:
+                    entry.sketch.merge(merged)
+
+            if refresh:
+                try:
+                    async for stored in db.viewerSketches.find({"_id": {"$in": refresh}}, {"registers": 1}):
+                        entry = self._sketches.get(stored["_id"])
+                        if entry is not None and stored.get("registers"):
+                            entry.sketch.merge(stored["registers"])
+                except Exception as e:
+                    print(f"Error refreshing viewer sketches: {e}")
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def start(self):
+        if self._task is None and get_redis() is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flush loop and save what is left."""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+unique_viewers = UniqueViewers()
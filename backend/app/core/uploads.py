@@ -0,0 +1,371 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple
+import aiofiles
+import aiofiles.os
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+# Content-addressed upload storage
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "uploads_tmp")
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Allowance for multipart boundaries, headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Resumable upload sessions for large attachments
+UPLOAD_SESSION_MAX_BYTES = int(os.getenv("UPLOAD_SESSION_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_SESSION_CHUNK_SIZE = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", str(5 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 60 * 60)))
+UPLOAD_SESSION_DIR = os.path.join(UPLOAD_TMP_DIR, "sessions")
+
+_EXTENSION_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
+_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+_SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Sessions with a chunk being written right now
+_writing_sessions = set()
+
+
+class UploadTooLarge(Exception):
+    """Raised once an upload grows past the size limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes} byte limit")
+        self.max_bytes = max_bytes
+
+
+class UploadOffsetMismatch(Exception):
+    """Raised when a chunk doesn't start where the stored data ends."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadIncomplete(Exception):
+    """Raised when finalizing a session before every byte has arrived."""
+
+
+class InvalidUpload(Exception):
+    """Raised for a request that is not multipart or has no file part."""
+
+
+def normalize_extension(filename: Optional[str]) -> str:
+    """Lower-cased extension of a client filename, or "" if it looks unsafe."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION_PATTERN.fullmatch(extension) else ""
+
+
+def is_content_hash(value: str) -> bool:
+    return bool(_HASH_PATTERN.fullmatch(value))
+
+
+def blob_name(content_hash: str, extension: str) -> str:
+    return f"{content_hash}{extension}"
+
+
+def blob_path(content_hash: str, extension: str) -> str:
+    return os.path.join(UPLOAD_DIR, blob_name(content_hash, extension))
+
+
+def blob_url(content_hash: str, extension: str) -> str:
+    return f"/uploads/{blob_name(content_hash, extension)}"
+
+
+def new_temp_path() -> str:
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    return os.path.join(UPLOAD_TMP_DIR, f"{uuid.uuid4()}.part")
+
+
+async def commit_blob(temp_path: str, content_hash: str, extension: str) -> bool:
+    """Move a fully written temp file into place under its content hash.
+
+    Returns True if an identical blob was already stored, in which case
+    the temp file is discarded.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = blob_path(content_hash, extension)
+    if await aiofiles.os.path.exists(path):
+        await aiofiles.os.remove(temp_path)
+        return True
+    await aiofiles.os.replace(temp_path, path)
+    return False
+
+
+async def store_stream(
+    chunks: AsyncIterator[bytes],
+    extension: str,
+    max_bytes: int = UPLOAD_MAX_BYTES
+) -> Tuple[str, int, bool]:
+    """Write a stream of chunks to content-addressed storage.
+
+    The SHA-256 is computed while the chunks are written to a temp file,
+    and the size limit is enforced as they arrive so an oversized upload
+    is abandoned without being buffered. Returns (sha256, size, deduplicated).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = new_temp_path()
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    content_hash = digest.hexdigest()
+    deduplicated = await commit_blob(temp_path, content_hash, extension)
+    return content_hash, size, deduplicated
+
+
+async def _multipart_events(
+    content_type: str,
+    body: AsyncIterator[bytes],
+    max_bytes: int
+) -> AsyncIterator[Tuple[str, object]]:
+    """Parse a multipart body as it arrives.
+
+    Yields ("headers", {name: value}) when a part starts, ("data", bytes)
+    for its content and ("end", None) when it ends. Raises UploadTooLarge
+    as soon as the raw body passes max_bytes, without reading the rest.
+    """
+    mime_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise InvalidUpload("Expected a multipart/form-data body")
+
+    events: List[Tuple[str, object]] = []
+    headers = {}
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers[bytes(header_field).decode("latin-1").lower()] = bytes(header_value).decode("latin-1")
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("headers", dict(headers)))
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    received = 0
+    async for chunk in body:
+        received += len(chunk)
+        if received > max_bytes:
+            raise UploadTooLarge(max_bytes - MULTIPART_OVERHEAD)
+        parser.write(chunk)
+        while events:
+            yield events.pop(0)
+    parser.finalize()
+    while events:
+        yield events.pop(0)
+
+
+async def multipart_file(
+    content_type: str,
+    body: AsyncIterator[bytes],
+    field_name: str = "file",
+    max_bytes: int = UPLOAD_MAX_BYTES
+) -> Tuple[Optional[str], AsyncIterator[bytes]]:
+    """Find a file field in a streamed multipart body.
+
+    Returns the client filename and an iterator over the file's bytes,
+    which reads the request body only as it is consumed, so the size
+    limit stops an upload mid-stream rather than after it was spooled.
+    """
+    events = _multipart_events(content_type, body, max_bytes + MULTIPART_OVERHEAD)
+    async for kind, value in events:
+        if kind != "headers":
+            continue
+        _, options = parse_options_header(value.get("content-disposition", ""))
+        if options.get(b"name", b"").decode("utf-8", "replace") != field_name or b"filename" not in options:
+            continue
+
+        async def file_chunks() -> AsyncIterator[bytes]:
+            async for part_kind, data in events:
+                if part_kind == "end":
+                    return
+                if part_kind == "data":
+                    yield data
+
+        return options[b"filename"].decode("utf-8", "replace"), file_chunks()
+    raise InvalidUpload(f"Missing file field '{field_name}'")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Upload sessions
+#
+# A session is a metadata file plus a .part file under UPLOAD_SESSION_DIR.
+# The .part file's length is the session's offset, so a session survives
+# dropped connections and restarts: the client asks for the offset and
+# resumes from there.
+
+def _session_meta_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, f"{session_id}.json")
+
+
+def _session_data_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, f"{session_id}.part")
+
+
+def create_upload_session(owner_id: str, filename: Optional[str], size: int) -> dict:
+    """Start a session for a file of ``size`` bytes."""
+    if size > UPLOAD_SESSION_MAX_BYTES:
+        raise UploadTooLarge(UPLOAD_SESSION_MAX_BYTES)
+
+    os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+    purge_expired_sessions()
+    now = time.time()
+    session = {
+        "id": uuid.uuid4().hex,
+        "ownerId": owner_id,
+        "filename": filename,
+        "extension": normalize_extension(filename),
+        "size": size,
+        "createdAt": now,
+        "expiresAt": now + UPLOAD_SESSION_TTL
+    }
+    open(_session_data_path(session["id"]), 'wb').close()
+    with open(_session_meta_path(session["id"]), 'w') as f:
+        json.dump(session, f)
+    return session
+
+
+def load_upload_session(session_id: str) -> Optional[dict]:
+    """A live session by id, or None if it is unknown or expired."""
+    if not _SESSION_ID_PATTERN.fullmatch(session_id):
+        return None
+    try:
+        with open(_session_meta_path(session_id), 'r') as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if session.get("expiresAt", 0) < time.time():
+        delete_upload_session(session_id)
+        return None
+    return session
+
+
+def session_offset(session_id: str) -> int:
+    try:
+        return os.path.getsize(_session_data_path(session_id))
+    except OSError:
+        return 0
+
+
+async def append_session_chunk(session: dict, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """Append a chunk that starts at ``offset``; returns the new offset.
+
+    Bytes are written as they arrive, so a chunk cut off by a dropped
+    connection still advances the offset by whatever was received.
+    """
+    session_id = session["id"]
+    current = session_offset(session_id)
+    if offset != current or session_id in _writing_sessions:
+        raise UploadOffsetMismatch(current)
+
+    _writing_sessions.add(session_id)
+    try:
+        async with aiofiles.open(_session_data_path(session_id), 'ab') as f:
+            async for chunk in chunks:
+                if current + len(chunk) > session["size"]:
+                    raise UploadTooLarge(session["size"])
+                await f.write(chunk)
+                current += len(chunk)
+    finally:
+        _writing_sessions.discard(session_id)
+    return current
+
+
+async def finalize_upload_session(session: dict) -> Tuple[str, int, bool]:
+    """Move a complete session's data into content-addressed storage.
+
+    The assembled file is hashed in a worker thread and renamed into
+    place, never loaded into memory. Returns (sha256, size, deduplicated).
+    """
+    data_path = _session_data_path(session["id"])
+    size = session_offset(session["id"])
+    if size != session["size"] or session["id"] in _writing_sessions:
+        raise UploadIncomplete(f"Received {size} of {session['size']} bytes")
+
+    content_hash = await asyncio.to_thread(file_sha256, data_path)
+    deduplicated = await commit_blob(data_path, content_hash, session["extension"])
+    delete_upload_session(session["id"])
+    return content_hash, size, deduplicated
+
+
+def delete_upload_session(session_id: str):
+    for path in (_session_meta_path(session_id), _session_data_path(session_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def purge_expired_sessions() -> List[str]:
+    """Remove sessions past their expiry; returns their ids."""
+    expired = []
+    if not os.path.isdir(UPLOAD_SESSION_DIR):
+        return expired
+    now = time.time()
+    for name in os.listdir(UPLOAD_SESSION_DIR):
+        if not name.endswith(".json"):
+            continue
+        session_id = name[:-len(".json")]
+        try:
+            with open(_session_meta_path(session_id), 'r') as f:
+                expires_at = json.load(f).get("expiresAt", 0)
+        except (OSError, ValueError):
+            continue
+        if expires_at < now:
+            delete_upload_session(session_id)
+            expired.append(session_id)
+    return expired
@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from app.core.cache import TTLCache
+from app.database.mongo import db
+from app.database.redis import get_redis
+
+# Slim user principal cache (uid -> principal)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+REDIS_KEY_PREFIX = "user:principal:"
+
+# Fields every authenticated route may rely on without loading the full document
+PRINCIPAL_FIELDS = ("_id", "uid", "email", "displayName", "photoURL", "role", "onboardingCompleted")
+PRINCIPAL_PROJECTION = {field: 1 for field in PRINCIPAL_FIELDS}
+
+_principals = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def to_principal(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a user document to the fields kept in the principal."""
+    return {field: user[field] for field in PRINCIPAL_FIELDS if field in user}
+
+def peek_user_principal(uid: str) -> Optional[Dict[str, Any]]:
+    """Return the in-process principal for uid without any I/O."""
+    return _principals.get(uid)
+
+async def get_user_principal(uid: str) -> Optional[Dict[str, Any]]:
+    """Resolve uid to a slim user principal.
+
+    Looks in process memory first, then Redis when configured, and only
+    then queries MongoDB with a projection.
+    """
+    principal = _principals.get(uid)
+    if principal is not None:
+        return principal
+
+    redis = get_redis()
+    if redis is not None:
+        try:
+            cached = await redis.get(REDIS_KEY_PREFIX + uid)
+            if cached:
+                principal = json.loads(cached)
+                principal["_id"] = ObjectId(principal["_id"])
+                _principals.set(uid, principal)
+                return principal
+        except Exception as e:
+            print(f"Error reading user principal from Redis: {e}")
+
+    principal = await db.users.find_one({"uid": uid}, PRINCIPAL_PROJECTION)
+    if principal is None:
+        return None
+
+    _principals.set(uid, principal)
+    if redis is not None:
+        try:
+            await redis.set(
+                REDIS_KEY_PREFIX + uid,
+                json.dumps(principal, default=str),
+                ex=USER_CACHE_TTL
+            )
+        except Exception as e:
+            print(f"Error writing user principal to Redis: {e}")
+    return principal
+
+async def invalidate_user(uid: Optional[str]):
+    """Drop the cached principal after the user document changes."""
+    if not uid:
+        return
+    _principals.pop(uid)
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await redis.delete(REDIS_KEY_PREFIX + uid)
+        except Exception as e:
+            print(f"Error invalidating user principal in Redis: {e}")
@@ -0,0 +1,516 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.core.text_index import InvertedIndex
+from app.core.totals import get_total, adjust_total
+from app.database.mongo import db
+from app.database.json_writer import JSONFileWriter
+
+# Storage backend for community posts (mongo | file)
+COMMUNITY_POSTS_BACKEND = os.getenv("COMMUNITY_POSTS_BACKEND", "mongo")
+COMMUNITY_POSTS_FILE = "community_posts.json"
+COMMUNITY_ENGAGEMENT_FILE = os.getenv("COMMUNITY_ENGAGEMENT_FILE", "community_engagement.json")
+
+DATE_FIELDS = ("createdAt", "updatedAt")
+
+# Posts per batch when backfilling or recounting engagement in MongoDB
+ENGAGEMENT_BATCH_SIZE = 1000
+
+# Searched fields and their relevance weights (text index / in-memory index)
+COMMUNITY_POST_TEXT_WEIGHTS = {"content": 1, "tags": 5}
+
+
+# Engagement kinds and the denormalized count each one maintains on the post
+ENGAGEMENT_COUNT_FIELDS = {"like": "likeCount", "bookmark": "bookmarkCount"}
+
+
+def engagement_count_field(kind: str, emoji: str = "") -> str:
+    if kind == "reaction":
+        return f"reactionCounts.{emoji}"
+    return ENGAGEMENT_COUNT_FIELDS[kind]
+
+
+def _marker(kind: str, emoji: str = "") -> str:
+    return f"reaction:{emoji}" if kind == "reaction" else kind
+
+
+def _parse_marker(marker: str) -> Tuple[str, str]:
+    kind, _, emoji = marker.partition(":")
+    return kind, emoji
+
+
+def engagement_summary(markers) -> dict:
+    """Shape one post's engagement markers for the current user."""
+    markers = set(markers)
+    return {
+        "liked": "like" in markers,
+        "bookmarked": "bookmark" in markers,
+        "reactions": sorted(marker[len("reaction:"):] for marker in markers if marker.startswith("reaction:"))
+    }
+
+
+def _legacy_engagements(post: dict) -> List[Tuple[str, str, str]]:
+    """(kind, emoji, user id) for the likes/bookmarks/reactions arrays older posts carry."""
+    engagements = [("like", "", user_id) for user_id in post.get("likes", [])]
+    engagements += [("bookmark", "", user_id) for user_id in post.get("bookmarks", [])]
+    engagements += [
+        ("reaction", emoji, user_id)
+        for emoji, user_ids in (post.get("reactions") or {}).items() for user_id in user_ids
+    ]
+    return list(dict.fromkeys(engagements))
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+class CommunityPostStore:
+    """Interface for community post storage backends.
+
+    Posts are returned newest first. ``toggle_engagement`` returns
+    ``"added"`` or ``"removed"``, or ``None`` when the post does not exist;
+    each toggle also moves the post's ``likeCount``, ``bookmarkCount`` or
+    ``reactionCounts.<emoji>`` by one.
+    """
+
+    async def create(self, post_doc: dict) -> dict:
+        raise NotImplementedError
+
+    async def list_posts(
+        self,
+        pod_filter: Optional[str],
+        skip: int,
+        limit: int,
+        include_total: bool = True
+    ) -> Tuple[List[dict], Optional[int]]:
+        raise NotImplementedError
+
+    async def toggle_engagement(self, post_id: str, user_id: str, kind: str, emoji: str = "") -> Optional[str]:
+        raise NotImplementedError
+
+    async def engagement_for(self, user_id: str, post_ids: List[str]) -> Dict[str, dict]:
+        """The user's like/bookmark/reaction state for each of post_ids."""
+        raise NotImplementedError
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        include_total: bool = True
+    ) -> Tuple[List[Tuple[float, dict]], Optional[int]]:
+        """The best ``limit`` (score, post) matches for query, and how many posts match."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Backend name and, for in-memory backends, how much memory the posts use."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Persist any pending state before shutdown."""
+
+    async def toggle_like(self, post_id: str, user_id: str) -> Optional[str]:
+        """Returns ``"liked"`` or ``"unliked"``, or ``None`` when the post does not exist."""
+        action = await self.toggle_engagement(post_id, user_id, "like")
+        if action is None:
+            return None
+        return "liked" if action == "added" else "unliked"
+
+
+class FileCommunityPostStore(CommunityPostStore):
+    """Keeps community posts in memory, persisted to a JSON file.
+
+    Posts are held oldest first, overall and per pod, so a new post is an
+    append and a page is a slice from the end: lookups by id, pod-filtered
+    pages and totals cost O(page) rather than O(all posts). The file keeps
+    its newest-first order. Search uses an in-memory inverted index.
+
+    Suitable for single-worker deployments without MongoDB only: every
+    worker holds its own copy of the list.
+    """
+
+    def __init__(self, path: str = COMMUNITY_POSTS_FILE, engagement_path: str = COMMUNITY_ENGAGEMENT_FILE):
+        self.path = path
+        self.engagement_path = engagement_path
+        self.timeline: List[dict] = []
+        self.posts_by_id: Dict[str, dict] = {}
+        self.pod_timelines: Dict[str, List[dict]] = {}
+        self.post_bytes = 0
+        self.search_index = InvertedIndex(COMMUNITY_POST_TEXT_WEIGHTS)
+        for post in reversed(self.load_community_posts()):
+            self._index(post)
+        # Posts are copied because toggles change their counts while a write serializes them
+        self._posts_writer = JSONFileWriter(self.path, lambda: [dict(post) for post in reversed(self.timeline)])
+        # user id -> post id -> engagement markers ("like", "bookmark", "reaction:<emoji>")
+        self.engagements: Dict[str, Dict[str, Set[str]]] = self.load_engagements()
+        self._recount()
+        self._engagement_writer = JSONFileWriter(self.engagement_path, self._engagement_snapshot)
+
+    def load_community_posts(self) -> List[dict]:
+        """Load community posts from file."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading community posts: {e}")
+        return []
+
+    async def save_community_posts(self):
+        """Save community posts to file (group-committed, see JSONFileWriter)."""
+        await self._posts_writer.commit()
+
+    def _index(self, post: dict):
+        self.timeline.append(post)
+        self.posts_by_id[post.get("_id")] = post
+        self.pod_timelines.setdefault(post.get("podId"), []).append(post)
+        self.search_index.add(post.get("_id"), post)
+        self.post_bytes += len(json.dumps(post, default=str))
+
+    @staticmethod
+    def _newest_page(timeline: List[dict], skip: int, limit: int) -> List[dict]:
+        end = len(timeline) - skip
+        if end <= 0:
+            return []
+        return timeline[max(0, end - limit):end][::-1]
+
+    def stats(self) -> dict:
+        index_bytes = (
+            sys.getsizeof(self.timeline)
+            + sys.getsizeof(self.posts_by_id)
+            + sys.getsizeof(self.pod_timelines)
+            + sum(sys.getsizeof(timeline) for timeline in self.pod_timelines.values())
+        )
+        return {
+            "backend": "file",
+            "posts": len(self.timeline),
+            "pods": len(self.pod_timelines),
+            # Approximate: serialized size of the posts plus the index containers
+            "postBytes": self.post_bytes,
+            "indexBytes": index_bytes,
+            "searchTerms": len(self.search_index.postings)
+        }
+
+    def load_engagements(self) -> Dict[str, Dict[str, Set[str]]]:
+        """Load per-user engagement sets, seeding them from legacy post arrays on first run.
+
+        The sets are the source of truth: ``_recount`` rebuilds the posts'
+        counts from them, since the two files are written independently
+        and a crash between the writes can leave the counts behind.
+        """
+        try:
+            if os.path.exists(self.engagement_path):
+                with open(self.engagement_path, 'r') as f:
+                    stored = json.load(f)
+                return {
+                    user_id: {post_id: set(markers) for post_id, markers in posts.items()}
+                    for user_id, posts in stored.items()
+                }
+        except Exception as e:
+            print(f"Error loading community engagement: {e}")
+            return {}
+
+        engagements: Dict[str, Dict[str, Set[str]]] = {}
+        for post in self.timeline:
+            for kind, emoji, user_id in _legacy_engagements(post):
+                engagements.setdefault(user_id, {}).setdefault(post["_id"], set()).add(_marker(kind, emoji))
+        return engagements
+
+    def _recount(self):
+        """Rebuild every post's engagement counts from the engagement sets."""
+        for post in self.timeline:
+            post.update({field: 0 for field in ENGAGEMENT_COUNT_FIELDS.values()}, reactionCounts={})
+        for posts in self.engagements.values():
+            for post_id, markers in posts.items():
+                post = self.posts_by_id.get(post_id)
+                if post is None:
+                    continue
+                for marker in markers:
+                    self._adjust_count(post, *_parse_marker(marker), 1)
+
+    def _engagement_snapshot(self) -> dict:
+        return {
+            user_id: {post_id: sorted(markers) for post_id, markers in posts.items()}
+            for user_id, posts in self.engagements.items()
+        }
+
+    async def save_engagements(self):
+        """Save per-user engagement sets to file (group-committed, see JSONFileWriter)."""
+        await self._engagement_writer.commit()
+
+    @staticmethod
+    def _adjust_count(post: dict, kind: str, emoji: str, delta: int):
+        if kind == "reaction":
+            # Replaced rather than changed in place, as a pending write may hold the old dict
+            counts = dict(post.get("reactionCounts") or {})
+            counts[emoji] = max(0, counts.get(emoji, 0) + delta)
+            if not counts[emoji]:
+                del counts[emoji]
+            post["reactionCounts"] = counts
+        else:
+            field = ENGAGEMENT_COUNT_FIELDS[kind]
+            post[field] = max(0, post.get(field, 0) + delta)
+
+    async def create(self, post_doc: dict) -> dict:
+        for field in DATE_FIELDS:
+            if isinstance(post_doc.get(field), datetime):
+                post_doc[field] = post_doc[field].isoformat()
+        self._index(post_doc)
+        await self.save_community_posts()
+        return post_doc
+
+    async def list_posts(self, pod_filter, skip, limit, include_total=True):
+        timeline = self.pod_timelines.get(pod_filter, []) if pod_filter else self.timeline
+        total = len(timeline) if include_total else None
+        return self._newest_page(timeline, skip, limit), total
+
+    async def toggle_engagement(self, post_id, user_id, kind, emoji=""):
+        post = self.posts_by_id.get(post_id)
+        if not post:
+            return None
+
+        user_posts = self.engagements.setdefault(user_id, {})
+        markers = user_posts.setdefault(post_id, set())
+        marker = _marker(kind, emoji)
+        if marker in markers:
+            markers.discard(marker)
+            if not markers:
+                del user_posts[post_id]
+                if not user_posts:
+                    del self.engagements[user_id]
+            self._adjust_count(post, kind, emoji, -1)
+            action = "removed"
+        else:
+            markers.add(marker)
+            self._adjust_count(post, kind, emoji, 1)
+            action = "added"
+
+        await asyncio.gather(self.save_community_posts(), self.save_engagements())
+        return action
+
+    async def engagement_for(self, user_id, post_ids):
+        user_posts = self.engagements.get(user_id, {})
+        return {post_id: engagement_summary(user_posts.get(post_id, ())) for post_id in post_ids}
+
+    async def search(self, query, limit, include_total=True):
+        hits, total = self.search_index.search(query, limit)
+        matches = [(score, self.posts_by_id[post_id]) for score, post_id in hits]
+        return matches, total if include_total else None
+
+    async def close(self):
+        await self._posts_writer.close()
+        await self._engagement_writer.close()
+
+
+class MongoCommunityPostStore(CommunityPostStore):
+    """Stores community posts in the indexed ``communityPosts`` collection.
+
+    Post ids stay hex strings so existing client links keep working.
+    Engagement lives in ``communityEngagements``, one document per
+    (user, post, kind, emoji) under a unique index, so a toggle is a
+    single insert or delete and the post's counts move with ``$inc``.
+    """
+
+    def stats(self) -> dict:
+        return {"backend": "mongo"}
+
+    async def create(self, post_doc: dict) -> dict:
+        for field in DATE_FIELDS:
+            post_doc[field] = _to_datetime(post_doc.get(field))
+        await db.communityPosts.insert_one(post_doc)
+        adjust_total("communityPosts", {"podId": post_doc["podId"]}, 1)
+        return post_doc
+
+    async def list_posts(self, pod_filter, skip, limit, include_total=True):
+        filter_query = {}
+        if pod_filter:
+            filter_query["podId"] = pod_filter
+
+        cursor = db.communityPosts.find(filter_query).sort("createdAt", -1).skip(skip).limit(limit)
+        posts = await cursor.to_list(length=limit)
+        total = await get_total(db.communityPosts, filter_query, include_total)
+        return posts, total
+
+    async def toggle_engagement(self, post_id, user_id, kind, emoji=""):
+        if not await db.communityPosts.find_one({"_id": post_id}, {"_id": 1}):
+            return None
+
+        engagement = {"userId": user_id, "postId": post_id, "kind": kind, "emoji": emoji}
+        count_field = engagement_count_field(kind, emoji)
+        for _ in range(3):
+            try:
+                await db.communityEngagements.insert_one(dict(engagement, createdAt=datetime.utcnow()))
+            except DuplicateKeyError:
+                result = await db.communityEngagements.delete_one(engagement)
+                if result.deleted_count:
+                    await db.communityPosts.update_one({"_id": post_id}, {"$inc": {count_field: -1}})
+                    return "removed"
+                # A concurrent toggle removed it first; adding is now the toggle
+                continue
+            await db.communityPosts.update_one({"_id": post_id}, {"$inc": {count_field: 1}})
+            return "added"
+        raise RuntimeError(f"Conflicting engagement toggles on post {post_id}")
+
+    async def engagement_for(self, user_id, post_ids):
+        markers: Dict[str, Set[str]] = {post_id: set() for post_id in post_ids}
+        cursor = db.communityEngagements.find(
+            {"userId": user_id, "postId": {"$in": list(markers)}},
+            {"_id": 0, "postId": 1, "kind": 1, "emoji": 1}
+        )
+        async for engagement in cursor:
+            markers[engagement["postId"]].add(_marker(engagement["kind"], engagement.get("emoji", "")))
+        return {post_id: engagement_summary(markers[post_id]) for post_id in post_ids}
+
+    async def search(self, query, limit, include_total=True):
+        filter_query = {"$text": {"$search": query}}
+        matches = []
+        if limit:
+            cursor = db.communityPosts.find(
+                filter_query, {"score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+            async for post in cursor:
+                matches.append((post.pop("score"), post))
+        total = await get_total(db.communityPosts, filter_query, include_total)
+        return matches, total
+
+
+def create_community_post_store() -> CommunityPostStore:
+    """Create the community post store selected by COMMUNITY_POSTS_BACKEND."""
+    if COMMUNITY_POSTS_BACKEND == "file":
+        return FileCommunityPostStore()
+    return MongoCommunityPostStore()
+
+
+async def import_community_posts(path: str = COMMUNITY_POSTS_FILE) -> int:
+    """Upsert every post from a community_posts.json file into MongoDB.
+
+    Likes, bookmarks and reactions in the file become engagement documents.
+    Safe to run more than once: posts are matched on their ``_id`` and
+    engagements on their unique key, and counts are recomputed from
+    ``communityEngagements`` afterwards, so engagement toggled since an
+    earlier import is kept.
+    """
+    with open(path, 'r') as f:
+        posts = json.load(f)
+
+    operations = []
+    engagement_operations = []
+    for post in posts:
+        for field in DATE_FIELDS:
+            post[field] = _to_datetime(post.get(field))
+        for kind, emoji, user_id in _legacy_engagements(post):
+            engagement_operations.append(_engagement_upsert(post["_id"], kind, emoji, user_id, post.get("createdAt")))
+        post.update(likes=[], bookmarks=[], reactions={}, likeCount=0, bookmarkCount=0, reactionCounts={})
+        operations.append(ReplaceOne({"_id": post["_id"]}, post, upsert=True))
+
+    if operations:
+        await db.communityPosts.bulk_write(operations, ordered=False)
+    if engagement_operations:
+        await db.communityEngagements.bulk_write(engagement_operations, ordered=False)
+    await recount_engagements([post["_id"] for post in posts])
+    return len(operations)
+
+
+def _engagement_upsert(post_id: str, kind: str, emoji: str, user_id: str, created_at) -> UpdateOne:
+    return UpdateOne(
+        {"userId": user_id, "postId": post_id, "kind": kind, "emoji": emoji},
+        {"$setOnInsert": {"createdAt": created_at or datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def recount_engagements(post_ids: List[str]):
+    """Recompute likeCount, bookmarkCount and reactionCounts from communityEngagements.
+
+    Counts are replaced, so a toggle landing on the same post mid-recount
+    can be lost; run it while the posts are quiet, or again afterwards.
+    """
+    for start in range(0, len(post_ids), ENGAGEMENT_BATCH_SIZE):
+        batch = post_ids[start:start + ENGAGEMENT_BATCH_SIZE]
+        counts = {post_id: {"likeCount": 0, "bookmarkCount": 0, "reactionCounts": {}} for post_id in batch}
+        pipeline = [
+            {"$match": {"postId": {"$in": batch}}},
+            {"$group": {"_id": {"postId": "$postId", "kind": "$kind", "emoji": "$emoji"}, "count": {"$sum": 1}}}
+        ]
+        async for row in db.communityEngagements.aggregate(pipeline):
+            key = row["_id"]
+            post_counts = counts[key["postId"]]
+            if key["kind"] == "reaction":
+                post_counts["reactionCounts"][key["emoji"]] = row["count"]
+            else:
+                post_counts[ENGAGEMENT_COUNT_FIELDS[key["kind"]]] = row["count"]
+        operations = [UpdateOne({"_id": post_id}, {"$set": post_counts}) for post_id, post_counts in counts.items()]
+        if operations:
+            await db.communityPosts.bulk_write(operations, ordered=False)
+
+
+async def backfill_engagements() -> int:
+    """Move legacy likes/bookmarks/reactions arrays on MongoDB posts into engagement documents.
+
+    Posts written before engagement was stored per user (for example
+    ``likes: ["anonymous"]`` from the first MongoDB store) get engagement
+    documents and recomputed counts, and their arrays are emptied so the
+    two can no longer disagree. Posts already backfilled are skipped.
+    """
+    legacy_filter = {"$or": [
+        {"likes.0": {"$exists": True}},
+        {"bookmarks.0": {"$exists": True}},
+        {"reactions": {"$nin": [{}, None]}},
+        {"likeCount": {"$exists": False}}
+    ]}
+    cursor = db.communityPosts.find(legacy_filter, {"likes": 1, "bookmarks": 1, "reactions": 1, "createdAt": 1})
+    post_ids = []
+    engagement_operations = []
+    async for post in cursor:
+        post_ids.append(post["_id"])
+        for kind, emoji, user_id in _legacy_engagements(post):
+            engagement_operations.append(_engagement_upsert(post["_id"], kind, emoji, user_id, post.get("createdAt")))
+        if len(engagement_operations) >= ENGAGEMENT_BATCH_SIZE:
+            await db.communityEngagements.bulk_write(engagement_operations, ordered=False)
+            engagement_operations = []
+    if engagement_operations:
+        await db.communityEngagements.bulk_write(engagement_operations, ordered=False)
+
+    await recount_engagements(post_ids)
+    for start in range(0, len(post_ids), ENGAGEMENT_BATCH_SIZE):
+        await db.communityPosts.update_many(
+            {"_id": {"$in": post_ids[start:start + ENGAGEMENT_BATCH_SIZE]}},
+            {"$set": {"likes": [], "bookmarks": [], "reactions": {}}}
+        )
+    return len(post_ids)
+
+
+async def _run_backfill():
+    await db.connect()
+    try:
+        backfilled = await backfill_engagements()
+        print(f"INFO: Backfilled engagement for {backfilled} community posts.")
+    finally:
+        await db.close()
+
+
+async def _run_import(path: str):
+    await db.connect()
+    try:
+        imported = await import_community_posts(path)
+        print(f"INFO: Imported {imported} community posts from {path}.")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    # Usage: python -m app.database.community_posts [path/to/community_posts.json]
+    #        python -m app.database.community_posts --backfill
+    if sys.argv[1:2] == ["--backfill"]:
+        asyncio.run(_run_backfill())
+    else:
+        asyncio.run(_run_import(sys.argv[1] if len(sys.argv) > 1 else COMMUNITY_POSTS_FILE))
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+from typing import Any, Callable, Optional
+
+# Durability of the JSON-file stores (community posts, room messages):
+#   immediate - every change is written before the request returns
+#   batched   - changes within JSON_STORE_BATCH_WINDOW share one write, which requests wait for
+#   interval  - changes are written every JSON_STORE_FLUSH_INTERVAL seconds; requests do not wait
+JSON_STORE_DURABILITY = os.getenv("JSON_STORE_DURABILITY", "batched")
+JSON_STORE_BATCH_WINDOW = float(os.getenv("JSON_STORE_BATCH_WINDOW", "0.05"))
+JSON_STORE_FLUSH_INTERVAL = float(os.getenv("JSON_STORE_FLUSH_INTERVAL", "5"))
+
+DURABILITY_MODES = ("immediate", "batched", "interval")
+
+
+def write_file_atomic(path: str, data: bytes):
+    """Replace path with data so readers and crashes only ever see a whole file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JSONFileWriter:
+    """Group-commit writer for one JSON file.
+
+    Stores call ``commit()`` after changing their in-memory state.
+    ``snapshot`` runs on the event loop, so it never sees a change half
+    made, and must return a copy that later changes leave alone (shallow
+    copies of the containers are usually enough); a worker thread then
+    serializes the copy and writes it with temp file + ``os.replace``.
+    Writes never overlap, and any changes that arrive while one is in
+    progress are picked up by the next.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        snapshot: Callable[[], Any],
+        durability: str = JSON_STORE_DURABILITY,
+        batch_window: float = JSON_STORE_BATCH_WINDOW,
+        flush_interval: float = JSON_STORE_FLUSH_INTERVAL
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown JSON store durability mode: {durability}")
+        self.path = path
+        self.snapshot = snapshot
+        self.durability = durability
+        self.batch_window = batch_window
+        self.flush_interval = flush_interval
+        self.writes = 0
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._batch: Optional[asyncio.Future] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._interval_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def commit(self):
+        """Persist the current state according to the durability mode."""
+        self._dirty = True
+        if self.durability == "immediate":
+            await self._write()
+        elif self.durability == "batched":
+            if self._batch is None:
+                self._batch = asyncio.get_running_loop().create_future()
+                self._batch_task = asyncio.create_task(self._write_batch(self._batch))
+            # Shielded: a cancelled request must not cancel everyone else's write
+            await asyncio.shield(self._batch)
+        elif self._interval_task is None and not self._closing:
+            self._interval_task = asyncio.create_task(self._write_periodically())
+
+    async def _write_batch(self, batch: asyncio.Future):
+        await asyncio.sleep(self.batch_window)
+        if self._batch is batch:
+            # Changes from here on start the next batch
+            self._batch = None
+        await self._write()
+        batch.set_result(None)
+
+    async def _write_periodically(self):
+        while not self._closing:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so close() never interrupts a write halfway
+            await asyncio.shield(self._write())
+
+    def _serialize_and_write(self, state: Any):
+        write_file_atomic(self.path, json.dumps(state, default=str).encode("utf-8"))
+
+    async def _write(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._serialize_and_write, self.snapshot())
+                self.writes += 1
+            except Exception as e:
+                # Keep the changes pending so the next write retries them
+                self._dirty = True
+                print(f"Error saving {self.path}: {e}")
+
+    async def flush(self):
+        """Write any pending changes now."""
+        if self._batch is not None:
+            await asyncio.shield(self._batch)
+        await self._write()
+
+    async def close(self):
+        """Stop periodic writes and save what is left."""
+        self._closing = True
+        if self._interval_task is not None:
+            self._interval_task.cancel()
+            try:
+                await self._interval_task
+            except asyncio.CancelledError:
+                pass
+            self._interval_task = None
+        await self.flush()
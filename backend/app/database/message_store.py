@@ -0,0 +1,379 @@
+import asyncio
+import base64
+import bisect
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+from app.database.json_writer import JSONFileWriter
+
+# Legacy single-file storage for room messages
+ROOM_MESSAGES_FILE = "room_messages.json"
+
+# Append-only log storage configuration
+ROOM_MESSAGES_BACKEND = os.getenv("ROOM_MESSAGES_BACKEND", "log")
+ROOM_MESSAGES_DIR = os.getenv("ROOM_MESSAGES_DIR", "room_messages")
+ROOM_MESSAGES_SNAPSHOT_EVERY = int(os.getenv("ROOM_MESSAGES_SNAPSHOT_EVERY", "500"))
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+LOG_SUFFIX = ".log"
+# A log tail being folded into a new snapshot; appends go to a fresh log meanwhile
+ROTATED_SUFFIX = ".log.compacting"
+# Held by the one worker migrating a legacy file; older locks are left over from a crash
+MIGRATION_LOCK_SUFFIX = ".migrating"
+MIGRATION_LOCK_TIMEOUT = 300
+
+
+def write_snapshot_file(path: str, room_id: str, messages: List[dict]):
+    """Write a room snapshot so readers and crashes only ever see a whole file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"roomId": room_id, "messages": messages}, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class MessageStore:
+    """Base class for room message storage backends.
+
+    Messages are kept per room in send order. Every backend holds the
+    messages in memory so reads never touch the disk; subclasses only
+    decide how appends are persisted.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, List[dict]] = {}
+        self._positions: Dict[str, Dict[str, int]] = {}
+
+    def _add(self, room_id: str, message: dict):
+        messages = self._rooms.setdefault(room_id, [])
+        positions = self._positions.get(room_id)
+        if positions is not None:
+            positions[message.get("_id")] = len(messages)
+        messages.append(message)
+
+    async def start(self) -> None:
+        """Prepare storage before requests are served."""
+
+    async def append(self, room_id: str, message: dict) -> None:
+        raise NotImplementedError
+
+    async def get_messages(self, room_id: str) -> List[dict]:
+        return self._rooms.get(room_id, [])
+
+    async def count(self, room_id: str) -> int:
+        return len(self._rooms.get(room_id, []))
+
+    async def position_of(self, room_id: str, message_id: str) -> Optional[int]:
+        """Index of a message in its room, via a lazily built id index."""
+        positions = self._positions.get(room_id)
+        if positions is None:
+            positions = {
+                message.get("_id"): index
+                for index, message in enumerate(self._rooms.get(room_id, []))
+            }
+            self._positions[room_id] = positions
+        return positions.get(message_id)
+
+    async def position_of_timestamp(self, room_id: str, timestamp: str, after: bool = True) -> int:
+        """Index of the first message sent after (or at/after) an ISO timestamp."""
+        search = bisect.bisect_right if after else bisect.bisect_left
+        return search(
+            self._rooms.get(room_id, []),
+            timestamp,
+            key=lambda message: message.get("timestamp", "")
+        )
+
+    async def close(self) -> None:
+        """Persist any pending state before shutdown."""
+
+
+class JSONFileMessageStore(MessageStore):
+    """Stores every room in a single JSON file, rewritten by a group-commit writer."""
+
+    def __init__(self, path: str = ROOM_MESSAGES_FILE):
+        super().__init__()
+        self.path = path
+        self._rooms = self.load_room_messages()
+        # Messages are never changed once appended, so copying the lists is enough
+        self._writer = JSONFileWriter(
+            self.path, lambda: {room_id: list(messages) for room_id, messages in self._rooms.items()}
+        )
+
+    def load_room_messages(self) -> Dict[str, List[dict]]:
+        """Load room messages from file."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading room messages: {e}")
+        return {}
+
+    async def save_room_messages(self):
+        """Save room messages to file (group-committed, see JSONFileWriter)."""
+        await self._writer.commit()
+
+    async def append(self, room_id: str, message: dict) -> None:
+        self._add(room_id, message)
+        await self.save_room_messages()
+
+    async def close(self) -> None:
+        await self._writer.close()
+
+
+class AppendLogMessageStore(MessageStore):
+    """Stores each room as a compacted snapshot plus an append-only JSONL tail.
+
+    A send appends one line to the room's log. Once the tail grows past
+    ``snapshot_every`` lines, the room is compacted: the log is renamed
+    aside, and a worker thread writes the full history to a new snapshot
+    (temp file + ``os.replace``) and deletes the renamed log. Recovery
+    loads the snapshot and replays any renamed log and the tail, skipping
+    entries already folded into the snapshot; a torn final line left by a
+    crash mid-append is cut off so later appends start on a fresh line.
+
+    A legacy room_messages.json is migrated into snapshots by ``start``
+    (or ``python -m app.database.message_store``) and renamed aside.
+    """
+
+    def __init__(
+        self,
+        directory: str = ROOM_MESSAGES_DIR,
+        legacy_file: str = ROOM_MESSAGES_FILE,
+        snapshot_every: int = ROOM_MESSAGES_SNAPSHOT_EVERY
+    ):
+        super().__init__()
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.snapshot_every = max(1, snapshot_every)
+        self._tail_lengths: Dict[str, int] = {}
+        self._compactions: Dict[str, asyncio.Task] = {}
+        self._directory_ready = False
+
+        self._recover()
+
+    # File layout
+
+    @staticmethod
+    def _encode_room_id(room_id: str) -> str:
+        return base64.urlsafe_b64encode(room_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_room_id(name: str) -> str:
+        padding = "=" * (-len(name) % 4)
+        return base64.urlsafe_b64decode(name + padding).decode("utf-8")
+
+    def _snapshot_path(self, room_id: str) -> str:
+        return os.path.join(self.directory, self._encode_room_id(room_id) + SNAPSHOT_SUFFIX)
+
+    def _log_path(self, room_id: str) -> str:
+        return os.path.join(self.directory, self._encode_room_id(room_id) + LOG_SUFFIX)
+
+    def _rotated_log_path(self, room_id: str) -> str:
+        return os.path.join(self.directory, self._encode_room_id(room_id) + ROTATED_SUFFIX)
+
+    # Startup
+
+    def _recover(self):
+        """Rebuild in-memory rooms from snapshots and log tails."""
+        if not os.path.isdir(self.directory):
+            return
+        room_ids = set()
+        for name in os.listdir(self.directory):
+            for suffix in (SNAPSHOT_SUFFIX, LOG_SUFFIX, ROTATED_SUFFIX):
+                if name.endswith(suffix):
+                    try:
+                        room_ids.add(self._decode_room_id(name[:-len(suffix)]))
+                    except Exception:
+                        print(f"Error decoding room message file name: {name}")
+
+        for room_id in room_ids:
+            messages = self._read_snapshot(room_id)
+            seen_ids = {message.get("_id") for message in messages}
+            # An interrupted compaction leaves a renamed log older than the current one
+            tail = self._read_log(self._rotated_log_path(room_id)) + self._read_log(self._log_path(room_id))
+            for message in tail:
+                if message.get("_id") not in seen_ids:
+                    seen_ids.add(message.get("_id"))
+                    messages.append(message)
+            self._rooms[room_id] = messages
+            self._tail_lengths[room_id] = len(tail)
+
+    def _read_snapshot(self, room_id: str) -> List[dict]:
+        path = self._snapshot_path(room_id)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get("messages", [])
+        except Exception as e:
+            print(f"Error loading room snapshot {path}: {e}")
+            return []
+
+    def _read_log(self, path: str) -> List[dict]:
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # A crash mid-append leaves a partial final line; cut it off so the
+            # next append is not glued onto it
+            print(f"Discarding torn final entry in room log {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(complete)
+                f.flush()
+                os.fsync(f.fileno())
+            data = data[:complete]
+
+        messages = []
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Skipping corrupt entry in room log {path}")
+        return messages
+
+    # Writes
+
+    def _write_compaction(self, room_id: str, messages: List[dict]):
+        write_snapshot_file(self._snapshot_path(room_id), room_id, messages)
+        os.remove(self._rotated_log_path(room_id))
+
+    async def _compact(self, room_id: str):
+        """Fold the room's log tail into a fresh snapshot."""
+        try:
+            # Rename and copy on the event loop so both match the same appends;
+            # the snapshot write itself runs in a worker thread
+            log_path, rotated_path = self._log_path(room_id), self._rotated_log_path(room_id)
+            if os.path.exists(rotated_path):
+                # Left by a compaction that failed or was interrupted: keep its entries
+                with open(log_path, 'rb') as src, open(rotated_path, 'ab') as dst:
+                    dst.write(src.read())
+                os.remove(log_path)
+            else:
+                os.replace(log_path, rotated_path)
+            self._tail_lengths[room_id] = 0
+            await asyncio.to_thread(self._write_compaction, room_id, list(self._rooms[room_id]))
+        except Exception as e:
+            print(f"Error compacting room {room_id}: {e}")
+        finally:
+            self._compactions.pop(room_id, None)
+
+    async def append(self, room_id: str, message: dict) -> None:
+        if not self._directory_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._directory_ready = True
+        self._add(room_id, message)
+        with open(self._log_path(room_id), 'a') as f:
+            f.write(json.dumps(message, default=str) + "\n")
+
+        self._tail_lengths[room_id] = self._tail_lengths.get(room_id, 0) + 1
+        if self._tail_lengths[room_id] >= self.snapshot_every and room_id not in self._compactions:
+            self._compactions[room_id] = asyncio.create_task(self._compact(room_id))
+
+    async def start(self) -> None:
+        """Migrate a legacy room_messages.json, then reload the rooms."""
+        if not os.path.exists(self.legacy_file):
+            return
+        migrated = await asyncio.to_thread(migrate_legacy_room_messages_once, self.legacy_file, self.directory)
+        if migrated:
+            print(f"INFO: Migrated {migrated} rooms from {self.legacy_file} to {self.directory}/")
+        # Another worker may have done the migration; either way the snapshots changed
+        self._rooms.clear()
+        self._positions.clear()
+        self._tail_lengths.clear()
+        self._recover()
+
+    async def close(self) -> None:
+        if self._compactions:
+            await asyncio.gather(*self._compactions.values())
+        for room_id, tail_length in list(self._tail_lengths.items()):
+            if tail_length:
+                await self._compact(room_id)
+
+
+def migrate_legacy_room_messages(
+    legacy_file: str = ROOM_MESSAGES_FILE,
+    directory: str = ROOM_MESSAGES_DIR
+) -> int:
+    """Convert a legacy room_messages.json into per-room snapshots.
+
+    Legacy messages go in front of any a room's snapshot already holds,
+    skipping ids it has, so running again after an interruption is safe.
+    The legacy file is renamed to ``.migrated`` only after every snapshot
+    is written. Not safe to run concurrently; see
+    ``migrate_legacy_room_messages_once``.
+    """
+    with open(legacy_file, 'r') as f:
+        legacy_rooms = json.load(f)
+
+    os.makedirs(directory, exist_ok=True)
+    for room_id, messages in legacy_rooms.items():
+        path = os.path.join(directory, AppendLogMessageStore._encode_room_id(room_id) + SNAPSHOT_SUFFIX)
+        current = []
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                current = json.load(f).get("messages", [])
+        legacy_ids = {message.get("_id") for message in messages}
+        merged = messages + [message for message in current if message.get("_id") not in legacy_ids]
+        write_snapshot_file(path, room_id, merged)
+    os.replace(legacy_file, legacy_file + ".migrated")
+    return len(legacy_rooms)
+
+
+def migrate_legacy_room_messages_once(
+    legacy_file: str = ROOM_MESSAGES_FILE,
+    directory: str = ROOM_MESSAGES_DIR
+) -> int:
+    """Migrate from exactly one of several workers starting together.
+
+    The first worker to create the lock file migrates; the others wait
+    for the lock to go away and then find the legacy file renamed.
+    Returns how many rooms this call migrated.
+    """
+    lock_path = os.path.abspath(directory) + MIGRATION_LOCK_SUFFIX
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            # The legacy file is renamed last, so once it is gone the migration is done
+            if not os.path.exists(legacy_file):
+                return 0
+            try:
+                if time.time() - os.path.getmtime(lock_path) > MIGRATION_LOCK_TIMEOUT:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.1)
+
+    try:
+        if not os.path.exists(legacy_file):
+            return 0
+        return migrate_legacy_room_messages(legacy_file, directory)
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def create_message_store() -> MessageStore:
+    """Create the room message store selected by ROOM_MESSAGES_BACKEND."""
+    if ROOM_MESSAGES_BACKEND == "json":
+        return JSONFileMessageStore()
+    return AppendLogMessageStore()
+
+
+if __name__ == "__main__":
+    # Usage: python -m app.database.message_store [path/to/room_messages.json]
+    legacy_path = sys.argv[1] if len(sys.argv) > 1 else ROOM_MESSAGES_FILE
+    migrated = migrate_legacy_room_messages_once(legacy_path)
+    print(f"INFO: Migrated {migrated} rooms from {legacy_path} to {ROOM_MESSAGES_DIR}/")
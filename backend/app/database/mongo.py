@@ -57,5 +57,13 @@ class Database:
     def communityPosts(self):
         return self.db.communityPosts
 
+    @property
+    def communityEngagements(self):
+        return self.db.communityEngagements
+
+    @property
+    def viewerSketches(self):
+        return self.db.viewerSketches
+
 # Create database instance
 db = Database()
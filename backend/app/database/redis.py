@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+
+# Optional Redis connection shared by caches and pub/sub
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+_client = None
+
+def get_redis() -> Optional["redis.asyncio.Redis"]:
+    """Return the shared asyncio Redis client, or None when REDIS_URL is unset."""
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        import redis.asyncio
+        _client = redis.asyncio.from_url(REDIS_URL, decode_responses=True)
+    return _client
+
+async def close_redis():
+    """Close the shared Redis client if one was opened."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        print("✅ Disconnected from Redis.")
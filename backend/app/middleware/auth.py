@@ -1,17 +1,28 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from app.core.firebase import verify_token
+from app.core.firebase import verify_token_cached
+from app.core.user_cache import get_user_principal, peek_user_principal
+from app.core.session import sessions_enabled, is_session_token, decode_session_token, principal_from_claims
 from app.database.mongo import db
 from bson import ObjectId
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from Firebase token."""
+async def authenticate_token(token: str) -> dict:
+    """Resolve a Firebase or session token to the current user principal.
+
+    Returns a slim, cached view of the user (see ``PRINCIPAL_FIELDS``).
+    Session tokens are validated in process without contacting Firebase
+    or MongoDB.
+    """
     try:
-        token = credentials.credentials
-        decoded_token = verify_token(token)
+        if sessions_enabled() and is_session_token(token):
+            claims = decode_session_token(token)
+            return peek_user_principal(claims.get("uid")) or principal_from_claims(claims)
+
+        decoded_token = await verify_token_cached(token)
         uid = decoded_token.get("uid")
 
         if not uid:
@@ -20,8 +31,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 detail="Invalid token"
             )
 
-        # Find user in database
-        user = await db.users.find_one({"uid": uid})
+        # Resolve user principal (cached)
+        user = await get_user_principal(uid)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -35,6 +46,35 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail=f"Authentication failed: {str(e)}"
         )
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current user principal from the bearer token.
+
+    Routes that need the full document should depend on
+    ``get_current_user_full`` instead.
+    """
+    return await authenticate_token(credentials.credentials)
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[dict]:
+    """Get the current user principal on public routes, or None for anonymous or invalid tokens."""
+    if credentials is None:
+        return None
+    try:
+        return await authenticate_token(credentials.credentials)
+    except HTTPException:
+        return None
+
+async def get_current_user_full(current_user: dict = Depends(get_current_user)):
+    """Get the current user's full document from the database."""
+    user = await db.users.find_one({"_id": current_user["_id"]})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
 async def get_current_user_id(current_user: dict = Depends(get_current_user)) -> ObjectId:
     """Get current user ID as ObjectId."""
     return current_user["_id"]
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import zlib
+from typing import List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Response compression configuration
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Larger bodies are compressed in a worker thread so the event loop keeps serving
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", "262144"))
+COMPRESSION_EXCLUDED_PATHS = tuple(
+    path for path in os.getenv("COMPRESSION_EXCLUDED_PATHS", "/uploads").split(",") if path
+)
+
+# Media types that are already compressed or not worth compressing
+INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "application/pdf")
+
+
+def parse_accept_encoding(header: str) -> List[Tuple[str, float]]:
+    codings = []
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            codings.append((coding.strip().lower(), quality))
+    return codings
+
+
+def choose_encoding(header: Optional[str]) -> Optional[str]:
+    """Pick brotli or gzip from an Accept-Encoding header, preferring brotli on ties."""
+    if not header:
+        return None
+    accepted = {coding: quality for coding, quality in parse_accept_encoding(header)}
+    wildcard = accepted.get("*", 0.0)
+    candidates = []
+    for preference, coding in enumerate(("br", "gzip")):
+        if coding == "br" and brotli is None:
+            continue
+        quality = accepted.get(coding, wildcard)
+        if quality > 0:
+            candidates.append((-quality, preference, coding))
+    return min(candidates)[2] if candidates else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            # wbits 31 produces a gzip container
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._brotli = None
+
+    def compress(self, data: bytes) -> bytes:
+        if self._zlib is not None:
+            return self._zlib.compress(data)
+        return self._brotli.process(data)
+
+    def flush(self) -> bytes:
+        if self._zlib is not None:
+            return self._zlib.flush()
+        return self._brotli.finish()
+
+    def compress_chunk(self, data: bytes, final: bool) -> bytes:
+        body = self.compress(data)
+        if final:
+            body += self.flush()
+        return body
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client prefers.
+
+    Bodies under ``minimum_size`` are sent as-is, as are responses that
+    already carry a Content-Encoding, incompressible media types and
+    anything under the excluded path prefixes (uploaded files). Chunks of
+    COMPRESSION_THREAD_MIN_SIZE bytes or more are compressed in a worker
+    thread, so a large page does not stall other requests.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        excluded_paths: Tuple[str, ...] = COMPRESSION_EXCLUDED_PATHS
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressedResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+            return await asyncio.to_thread(self.compressor.compress_chunk, body, final)
+        return self.compressor.compress_chunk(body, final)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk shows the size
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or content_type.startswith(INCOMPRESSIBLE_TYPES)
+                or message["status"] in (204, 304)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if "content-length" in headers:
+                del headers["content-length"]
+            if not more_body:
+                body = await self._compress(body, final=True)
+                headers["Content-Length"] = str(len(body))
+            else:
+                body = await self._compress(body, final=False)
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        body = await self._compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.core.firebase import verify_token, get_user_by_uid
+from app.core.firebase import verify_token_cached, get_user_by_uid
 from app.database.mongo import db
 from app.models.user import UserModel, UserCreate
-from app.middleware.auth import get_current_user
+from app.core.session import (
+    sessions_enabled, issue_session_token, decode_session_token,
+    claim_session_token, SESSION_TOKEN_TTL
+)
+from app.core.user_cache import get_user_principal
+from app.middleware.auth import get_current_user_full
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import Dict, Any
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.post("/verify")
 async def verify_id_token(data: Dict[str, Any]):
@@ -17,7 +23,7 @@ async def verify_id_token(data: Dict[str, Any]):
         raise HTTPException(status_code=400, detail="Token not provided")
     
     try:
-        decoded = verify_token(token)
+        decoded = await verify_token_cached(token)
         uid = decoded["uid"]
         email = decoded.get("email", "")
         display_name = decoded.get("name", "Anonymous User")
@@ -46,7 +52,7 @@ async def verify_id_token(data: Dict[str, Any]):
 
         # Return user data
         if existing_user:
-            return {
+            result = {
                 "status": "success", 
                 "user": {
                     "uid": existing_user.get("uid"), 
@@ -56,12 +62,65 @@ async def verify_id_token(data: Dict[str, Any]):
                     "onboardingCompleted": existing_user.get("onboardingCompleted", False)
                 }
             }
+            # Issue a reusable session token when enabled
+            if sessions_enabled():
+                result["sessionToken"] = issue_session_token(existing_user)
+                result["sessionExpiresIn"] = SESSION_TOKEN_TTL
+            return result
         
         raise HTTPException(status_code=500, detail="Failed to retrieve user data after verification.")
 
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
+@router.post("/refresh")
+async def refresh_session_token(data: Dict[str, Any]):
+    """Exchange a session token (even recently expired) for a new one."""
+    if not sessions_enabled():
+        raise HTTPException(status_code=404, detail="Session tokens are not enabled")
+
+    token = data.get("token")
+    if not token:
+        raise HTTPException(status_code=400, detail="Token not provided")
+
+    try:
+        claims = decode_session_token(token, allow_expired=True)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    # Claim the token before anything else awaits, so a token refreshes only once
+    if not await claim_session_token(claims):
+        raise HTTPException(status_code=401, detail="Session token has been revoked")
+
+    # Reload the principal so deleted users and role changes are picked up
+    user = await get_user_principal(claims.get("uid"))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    return {
+        "status": "success",
+        "sessionToken": issue_session_token(user),
+        "sessionExpiresIn": SESSION_TOKEN_TTL
+    }
+
+@router.post("/logout")
+async def revoke_session(data: Dict[str, Any]):
+    """Revoke a session token so it can no longer be used or refreshed."""
+    if not sessions_enabled():
+        raise HTTPException(status_code=404, detail="Session tokens are not enabled")
+
+    token = data.get("token")
+    if not token:
+        raise HTTPException(status_code=400, detail="Token not provided")
+
+    try:
+        claims = decode_session_token(token, allow_expired=True)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    await claim_session_token(claims)
+    return {"status": "success", "message": "Session revoked"}
+
 @router.post("/register")
 async def register_user(user_data: UserCreate):
     """Register a new user with email/password."""
@@ -117,7 +176,7 @@ async def register_user(user_data: UserCreate):
         )
 
 @router.get("/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user_full)):
     """Get current user information."""
     return {
         "success": True,
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, WebSocket, WebSocketDisconnect
 from app.database.mongo import db
 from app.models.message import MessageModel, MessageCreate, MessageUpdate
-from app.middleware.auth import get_current_user
-from datetime import datetime
+from app.core.totals import get_total, adjust_total
+from app.core.pagination import paginate, next_cursor, valid_cursor, keyset_filter
+from app.core.pubsub import hub
+from app.core.recent_messages import recent_messages
+from app.core.memberships import is_member
+from app.core.counters import counters
+from app.middleware.auth import get_current_user, authenticate_token
+from app.database.message_store import create_message_store
+from app.core.responses import BSONRoute, dumps
+from datetime import datetime, timezone
 from bson import ObjectId
-from typing import List, Optional
-import json
-import os
+from typing import Awaitable, Callable, List, Optional
 from pydantic import BaseModel
+import asyncio
 
 # CORS dependency
 async def add_cors_headers(response: Response):
@@ -16,31 +23,10 @@ async def add_cors_headers(response: Response):
     response.headers["Access-Control-Allow-Headers"] = "*"
     response.headers["Access-Control-Max-Age"] = "86400"
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
-# Simple file-based storage for room messages
-ROOM_MESSAGES_FILE = "room_messages.json"
-
-def load_room_messages():
-    """Load room messages from file."""
-    try:
-        if os.path.exists(ROOM_MESSAGES_FILE):
-            with open(ROOM_MESSAGES_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading room messages: {e}")
-    return {}
-
-def save_room_messages(messages):
-    """Save room messages to file."""
-    try:
-        with open(ROOM_MESSAGES_FILE, 'w') as f:
-            json.dump(messages, f, default=str)
-    except Exception as e:
-        print(f"Error saving room messages: {e}")
-
-# Load existing messages on startup
-room_messages = load_room_messages()
+# Pluggable storage for room messages (append-only log by default)
+room_message_store = create_message_store()
 
 # Room Message Models
 class RoomMessageCreate(BaseModel):
@@ -52,6 +38,120 @@ class RoomMessageCreate(BaseModel):
     type: str = "text"
     attachment: Optional[dict] = None
 
+# Long-poll limits (seconds)
+LONG_POLL_DEFAULT_TIMEOUT = 25
+LONG_POLL_MAX_TIMEOUT = 60
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp into a naive UTC datetime like the stored ones."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+async def long_poll(channel: str, fetch: Callable[[], Awaitable[list]], timeout: int) -> list:
+    """Return fetch() as soon as it has results, waiting up to timeout for a publish.
+
+    The subscription is taken before the first fetch so a message sent in
+    between is never missed.
+    """
+    subscription = hub.subscribe(channel)
+    try:
+        results = await fetch()
+        if not results:
+            try:
+                await asyncio.wait_for(subscription.get(), timeout)
+            except asyncio.TimeoutError:
+                return results
+            results = await fetch()
+        return results
+    finally:
+        hub.unsubscribe(subscription)
+
+async def require_room_member(room_id: str, current_user: dict):
+    """Ensure the room exists and the current user is a member."""
+    if not ObjectId.is_valid(room_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid room ID"
+        )
+
+    if await is_member("rooms", ObjectId(room_id), current_user["_id"]):
+        return
+
+    # Not a member: tell a missing room apart from a forbidden one
+    if not await db.rooms.find_one({"_id": ObjectId(room_id)}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Room not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not a member of this room"
+    )
+
+async def message_position(room_id: ObjectId, value: str):
+    """Resolve an ``after``/``before`` value (message ID or timestamp) to (createdAt, _id)."""
+    if ObjectId.is_valid(value):
+        message = await db.messages.find_one(
+            {"_id": ObjectId(value), "roomId": room_id},
+            {"createdAt": 1}
+        )
+        if not message:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+        return message.get("createdAt"), message["_id"]
+
+    try:
+        return parse_timestamp(value), None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid message ID or timestamp"
+        )
+
+async def warm_recent_messages(room_id: ObjectId):
+    """Load a room's newest messages into the hot-room buffer on first read."""
+    room_key = f"messages:{room_id}"
+    if not recent_messages.reserve(room_key):
+        return
+    try:
+        cursor = db.messages.find({"roomId": room_id}).sort([("createdAt", -1), ("_id", -1)]).limit(recent_messages.per_room)
+        newest = await cursor.to_list(length=recent_messages.per_room)
+        newest.reverse()
+        recent_messages.warm(room_key, newest)
+    except Exception:
+        recent_messages.evict(room_key)
+        raise
+
+async def fetch_message_delta(room_id: ObjectId, after: Optional[str], before: Optional[str], limit: int) -> list:
+    """Messages strictly between two positions on the (roomId, createdAt) index.
+
+    With ``after`` the oldest matching messages come first, so clients can
+    append them; with only ``before`` the newest come first, like a page.
+    Catch-up reads after a recently sent message are served from the
+    hot-room buffer when it holds that message.
+    """
+    if after and not before:
+        messages = recent_messages.after(f"messages:{room_id}", after, limit)
+        if messages is not None:
+            return messages
+
+    conditions = [{"roomId": room_id}]
+    for value, op in ((after, "$gt"), (before, "$lt")):
+        if value:
+            created_at, message_id = await message_position(room_id, value)
+            if message_id is None:
+                conditions.append({"createdAt": {op: created_at}})
+            else:
+                conditions.append(keyset_filter(created_at, message_id, op))
+
+    direction = 1 if after else -1
+    cursor = db.messages.find({"$and": conditions}).sort([("createdAt", direction), ("_id", direction)]).limit(limit)
+    return await cursor.to_list(length=limit)
+
 @router.post("/")
 async def create_message(
     message_data: MessageCreate,
@@ -59,23 +159,11 @@ async def create_message(
 ):
     """Create a new message."""
     try:
-        # Check if room exists and user is member
-        room = await db.rooms.find_one({"_id": ObjectId(message_data.roomId)})
-        if not room:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Room not found"
-            )
-
-        if current_user["_id"] not in room.get("members", []):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not a member of this room"
-            )
+        await require_room_member(message_data.roomId, current_user)
 
         message_obj = MessageModel(
-            **message_data.model_dump(),
-            authorId=current_user["_id"],
+            **message_data.model_dump(exclude_none=True),
+            authorId=str(current_user["_id"]),
             authorName=current_user.get("displayName", "Anonymous"),
             authorAvatar=current_user.get("photoURL", ""),
             createdAt=datetime.utcnow(),
@@ -84,14 +172,20 @@ async def create_message(
 
         message_doc = message_obj.model_dump(by_alias=True, exclude_none=True)
         message_doc["_id"] = ObjectId()
+        # Store references as ObjectIds so room queries and indexes match
+        message_doc["roomId"] = ObjectId(message_data.roomId)
+        message_doc["authorId"] = current_user["_id"]
 
         await db.messages.insert_one(message_doc)
+        adjust_total("messages", {"roomId": ObjectId(message_data.roomId)}, 1)
 
         # Increment room message count
-        await db.rooms.update_one(
-            {"_id": ObjectId(message_data.roomId)},
-            {"$inc": {"messageCount": 1}}
-        )
+        counters.increment("rooms", message_doc["roomId"], "messageCount")
+
+        recent_messages.append(f"messages:{message_doc['roomId']}", message_doc)
+
+        # Push to WebSocket subscribers of this room
+        await hub.publish(f"messages:{message_data.roomId}", {"type": "message", "message": message_doc})
 
         return {
             "success": True,
@@ -111,34 +205,38 @@ async def get_messages(
     room_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal"),
+    after: Optional[str] = Query(None, description="Only messages after this message ID or timestamp"),
+    before: Optional[str] = Query(None, description="Only messages before this message ID or timestamp"),
     current_user: dict = Depends(get_current_user)
 ):
     """Get messages for a specific room."""
     try:
-        if not ObjectId.is_valid(room_id):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid room ID"
-            )
-
         # Check if user is member of room
-        room = await db.rooms.find_one({"_id": ObjectId(room_id)})
-        if not room:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Room not found"
-            )
+        await require_room_member(room_id, current_user)
 
-        if current_user["_id"] not in room.get("members", []):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not a member of this room"
-            )
+        if after or before:
+            messages = await fetch_message_delta(ObjectId(room_id), after, before, limit)
+            return {
+                "success": True,
+                "data": {
+                    "messages": messages,
+                    "limit": limit,
+                    "hasMore": len(messages) == limit
+                }
+            }
 
-        cursor = db.messages.find({"roomId": ObjectId(room_id)}).skip(skip).limit(limit).sort("createdAt", -1)
-        messages = await cursor.to_list(length=limit)
+        messages = None
+        if skip == 0 and not page_cursor:
+            # The newest page of an active room comes from process memory
+            await warm_recent_messages(ObjectId(room_id))
+            messages = recent_messages.latest(f"messages:{ObjectId(room_id)}", limit)
+        if messages is None:
+            cursor = paginate(db.messages, {"roomId": ObjectId(room_id)}, skip, limit, page_cursor)
+            messages = await cursor.to_list(length=limit)
 
-        total = await db.messages.count_documents({"roomId": ObjectId(room_id)})
+        total = await get_total(db.messages, {"roomId": ObjectId(room_id)}, include_total)
 
         return {
             "success": True,
@@ -146,7 +244,8 @@ async def get_messages(
                 "messages": messages,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(messages, limit)
             }
         }
     except HTTPException:
@@ -157,6 +256,93 @@ async def get_messages(
             detail=f"Failed to fetch messages: {str(e)}"
         )
 
+@router.get("/{room_id}/poll")
+async def poll_messages(
+    room_id: str,
+    after: str = Query(..., description="Last message ID or timestamp the client has"),
+    limit: int = Query(50, ge=1, le=100),
+    timeout: int = Query(LONG_POLL_DEFAULT_TIMEOUT, ge=1, le=LONG_POLL_MAX_TIMEOUT),
+    current_user: dict = Depends(get_current_user)
+):
+    """Long-poll for messages after ``after``, holding the request until some arrive."""
+    try:
+        await require_room_member(room_id, current_user)
+        messages = await long_poll(
+            f"messages:{room_id}",
+            lambda: fetch_message_delta(ObjectId(room_id), after, None, limit),
+            timeout
+        )
+        return {
+            "success": True,
+            "data": {
+                "messages": messages,
+                "limit": limit,
+                "hasMore": len(messages) == limit
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to poll messages: {str(e)}"
+        )
+
+async def stream_channel(websocket: WebSocket, channel: str):
+    """Forward a pub/sub channel to a WebSocket until either side goes away.
+
+    Each connection reads from its own bounded queue; a client too slow to
+    keep up is disconnected with 1013 and should reconnect and re-sync.
+    """
+    subscription = hub.subscribe(channel)
+
+    async def send_messages():
+        while True:
+            message = await subscription.get()
+            if message is None:
+                return
+            await websocket.send_text(dumps(message).decode("utf-8"))
+
+    async def receive_messages():
+        # Clients only send keepalives; this detects disconnects
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            return
+
+    sender = asyncio.create_task(send_messages())
+    receiver = asyncio.create_task(receive_messages())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        hub.unsubscribe(subscription)
+
+    if subscription.overflowed:
+        await websocket.close(code=1013, reason="Client too slow")
+
+@router.websocket("/{room_id}/ws")
+async def messages_websocket(websocket: WebSocket, room_id: str, token: str = Query(...)):
+    """Stream new messages for a room; authenticates with ?token=."""
+    try:
+        current_user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=1008, reason="Authentication failed")
+        return
+
+    if not ObjectId.is_valid(room_id):
+        await websocket.close(code=1008, reason="Invalid room ID")
+        return
+
+    if not await is_member("rooms", ObjectId(room_id), current_user["_id"]):
+        await websocket.close(code=1008, reason="Not a member of this room")
+        return
+
+    await websocket.accept()
+    await stream_channel(websocket, f"messages:{room_id}")
+
 # Room messaging endpoints (no authentication required)
 
 @router.options("/room")
@@ -187,12 +373,8 @@ async def create_room_message(
             "timestamp": datetime.utcnow().isoformat()
         }
 
-        global room_messages
-        if message_data.roomId not in room_messages:
-            room_messages[message_data.roomId] = []
-
-        room_messages[message_data.roomId].append(message_doc)
-        save_room_messages(room_messages)
+        await room_message_store.append(message_data.roomId, message_doc)
+        await hub.publish(f"room:{message_data.roomId}", {"type": "message", "message": message_doc})
 
         return {
             "success": True,
@@ -214,17 +396,57 @@ async def get_room_messages_options(room_id: str, response: Response):
     response.headers["Access-Control-Max-Age"] = "86400"
     return {"message": "OK"}
 
+async def room_message_bound(room_id: str, value: str, after: bool) -> int:
+    """Resolve an ``after``/``before`` value (message ID or timestamp) to a slice index."""
+    position = await room_message_store.position_of(room_id, value)
+    if position is not None:
+        return position + 1 if after else position
+
+    if ObjectId.is_valid(value):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Message not found"
+        )
+    try:
+        timestamp = parse_timestamp(value).isoformat()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid message ID or timestamp"
+        )
+    return await room_message_store.position_of_timestamp(room_id, timestamp, after=after)
+
+async def fetch_room_message_delta(room_id: str, after: Optional[str], before: Optional[str], limit: int) -> list:
+    """Room messages strictly between two positions, in send order."""
+    messages = await room_message_store.get_messages(room_id)
+    start = await room_message_bound(room_id, after, True) if after else 0
+    end = await room_message_bound(room_id, before, False) if before else len(messages)
+    delta = messages[start:end]
+    return delta[:limit] if after else delta[-limit:]
+
 @router.get("/room/{room_id}")
 async def get_room_messages(
     room_id: str,
     response: Response,
     skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Only messages after this message ID or timestamp"),
+    before: Optional[str] = Query(None, description="Only messages before this message ID or timestamp")
 ):
     await add_cors_headers(response)
     try:
-        global room_messages
-        messages = room_messages.get(room_id, [])
+        if after or before:
+            messages = await fetch_room_message_delta(room_id, after, before, limit)
+            return {
+                "success": True,
+                "data": {
+                    "messages": messages,
+                    "limit": limit,
+                    "hasMore": len(messages) == limit
+                }
+            }
+
+        messages = await room_message_store.get_messages(room_id)
         total = len(messages)
         paginated_messages = messages[skip:skip + limit]
         return {
@@ -236,8 +458,48 @@ async def get_room_messages(
                 "limit": limit
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch room messages: {str(e)}"
         )
+
+@router.get("/room/{room_id}/poll")
+async def poll_room_messages(
+    room_id: str,
+    response: Response,
+    after: str = Query(..., description="Last message ID or timestamp the client has"),
+    limit: int = Query(50, ge=1, le=100),
+    timeout: int = Query(LONG_POLL_DEFAULT_TIMEOUT, ge=1, le=LONG_POLL_MAX_TIMEOUT)
+):
+    """Long-poll for room messages after ``after``, holding the request until some arrive."""
+    await add_cors_headers(response)
+    try:
+        messages = await long_poll(
+            f"room:{room_id}",
+            lambda: fetch_room_message_delta(room_id, after, None, limit),
+            timeout
+        )
+        return {
+            "success": True,
+            "data": {
+                "messages": messages,
+                "limit": limit,
+                "hasMore": len(messages) == limit
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to poll room messages: {str(e)}"
+        )
+
+@router.websocket("/room/{room_id}/ws")
+async def room_messages_websocket(websocket: WebSocket, room_id: str):
+    """Stream new room messages as they are sent."""
+    await websocket.accept()
+    await stream_channel(websocket, f"room:{room_id}")
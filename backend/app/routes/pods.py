@@ -1,12 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from app.database.mongo import db
 from app.models.pod import PodModel, PodCreate, PodUpdate
+from app.core.user_cache import invalidate_user
+from app.core.memberships import is_member, remember_membership
+from app.core.feed import feed_timelines
+from app.core.counters import counters
+from app.core.unique_viewers import unique_viewers, viewer_key
+from app.core.totals import get_total
+from app.core.pagination import paginate, next_cursor, valid_cursor
+from app.core.http_cache import conditional_response, PRIVATE_CACHE_CONTROL
 from app.middleware.auth import get_current_user
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.post("/")
 async def create_pod(
@@ -51,7 +60,9 @@ async def create_pod(
 async def get_pods(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    category: Optional[str] = Query(None)
+    category: Optional[str] = Query(None),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal")
 ):
     """Get all public pods."""
     try:
@@ -59,10 +70,10 @@ async def get_pods(
         if category:
             filter_query["category"] = category
             
-        cursor = db.pods.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
+        cursor = paginate(db.pods, filter_query, skip, limit, page_cursor)
         pods = await cursor.to_list(length=limit)
         
-        total = await db.pods.count_documents(filter_query)
+        total = await get_total(db.pods, filter_query, include_total)
         
         return {
             "success": True,
@@ -70,9 +81,12 @@ async def get_pods(
                 "pods": pods,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(pods, limit)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -97,7 +111,12 @@ async def get_my_pods(current_user: dict = Depends(get_current_user)):
         )
 
 @router.get("/{pod_id}")
-async def get_pod(pod_id: str, current_user: dict = Depends(get_current_user)):
+async def get_pod(
+    pod_id: str,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """Get a specific pod by ID."""
     try:
         if not ObjectId.is_valid(pod_id):
@@ -114,12 +133,18 @@ async def get_pod(pod_id: str, current_user: dict = Depends(get_current_user)):
             )
             
         # Check if user can access private pod
-        if pod.get("isPrivate", False) and current_user["_id"] not in pod.get("members", []):
+        if pod.get("isPrivate", False) and not await is_member("pods", pod["_id"], current_user["_id"]):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to access this pod"
             )
-            
+
+        counters.with_pending("pods", pod)
+        pod["uniqueViewers"] = await unique_viewers.add("pods", pod["_id"], viewer_key(request, current_user))
+        not_modified = conditional_response(request, response, pod, PRIVATE_CACHE_CONTROL, "members", "postCount", "lastActivity")
+        if not_modified:
+            return not_modified
+
         return {
             "success": True,
             "data": {"pod": pod}
@@ -142,34 +167,33 @@ async def join_pod(pod_id: str, current_user: dict = Depends(get_current_user)):
                 detail="Invalid pod ID"
             )
             
-        pod = await db.pods.find_one({"_id": ObjectId(pod_id)})
-        if not pod:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Pod not found"
-            )
-            
-        # Check if already a member
-        if current_user["_id"] in pod.get("members", []):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Already a member of this pod"
-            )
-            
-        # Add user to pod
-        await db.pods.update_one(
-            {"_id": ObjectId(pod_id)},
+        # Add user to pod; the members match makes repeat joins a no-op
+        result = await db.pods.update_one(
+            {"_id": ObjectId(pod_id), "members": {"$ne": current_user["_id"]}},
             {
                 "$addToSet": {"members": current_user["_id"]},
                 "$inc": {"memberCount": 1}
             }
         )
+        if result.matched_count == 0:
+            if not await db.pods.find_one({"_id": ObjectId(pod_id)}, {"_id": 1}):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Pod not found"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Already a member of this pod"
+            )
+        remember_membership("pods", ObjectId(pod_id), current_user["_id"])
+        feed_timelines.invalidate(current_user["_id"])
         
         # Add pod to user's joined pods
         await db.users.update_one(
             {"_id": current_user["_id"]},
             {"$addToSet": {"joinedPods": ObjectId(pod_id)}}
         )
+        await invalidate_user(current_user.get("uid"))
         
         return {
             "success": True,
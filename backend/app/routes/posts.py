@@ -1,39 +1,27 @@
-import json
-import os
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from app.database.mongo import db
 from app.models.post import PostModel, PostCreate, PostUpdate
-from app.middleware.auth import get_current_user
+from app.core.totals import get_total, adjust_total
+from app.core.pagination import paginate, next_cursor, valid_cursor, decode_cursor
+from app.core.feed import feed_timelines, merge_pod_keys, load_posts, feed_cursor
+from app.core.memberships import is_member
+from app.core.counters import counters
+from app.core.unique_viewers import unique_viewers, viewer_key
+from app.middleware.auth import get_current_user, get_optional_user
+from app.database.community_posts import create_community_post_store
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
 from pydantic import BaseModel
 
-router = APIRouter(tags=["posts"])
+router = APIRouter(tags=["posts"], route_class=BSONRoute)
 
-# Simple in-memory storage for community posts (temporary solution)
-COMMUNITY_POSTS_FILE = "community_posts.json"
+# Community post storage (MongoDB by default, JSON file for lightweight mode)
+community_post_store = create_community_post_store()
 
-def load_community_posts():
-    """Load community posts from file."""
-    try:
-        if os.path.exists(COMMUNITY_POSTS_FILE):
-            with open(COMMUNITY_POSTS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading community posts: {e}")
-    return []
-
-def save_community_posts(posts):
-    """Save community posts to file."""
-    try:
-        with open(COMMUNITY_POSTS_FILE, 'w') as f:
-            json.dump(posts, f, default=str)
-    except Exception as e:
-        print(f"Error saving community posts: {e}")
-
-# Load existing posts on startup
-community_posts = load_community_posts()
+MAX_ENGAGEMENT_POSTS = 100
+MAX_REACTION_LENGTH = 16
 
 # Community Post Models
 class CommunityPostCreate(BaseModel):
@@ -77,6 +65,7 @@ async def create_community_post(
     """Create a new community post visible to all users."""
     try:
         # Create community post document with default user info
+        now = datetime.utcnow()
         post_doc = {
             "_id": str(ObjectId()),
             "userId": "anonymous",  # Default user ID
@@ -94,8 +83,11 @@ async def create_community_post(
             "comments": [],
             "bookmarks": [],
             "reactions": {},
-            "createdAt": datetime.utcnow().isoformat(),
-            "updatedAt": datetime.utcnow().isoformat()
+            "likeCount": 0,
+            "bookmarkCount": 0,
+            "reactionCounts": {},
+            "createdAt": now,
+            "updatedAt": now
         }
 
         # Add user info from frontend if provided
@@ -106,10 +98,7 @@ async def create_community_post(
         if post_data.userId:
             post_doc["userId"] = post_data.userId
 
-        # Add to in-memory storage
-        global community_posts
-        community_posts.insert(0, post_doc)
-        save_community_posts(community_posts)
+        post_doc = await community_post_store.create(post_doc)
 
         # If posting to a specific pod, update pod's post count
         if post_data.selectedPod:
@@ -133,21 +122,12 @@ async def create_community_post(
 async def get_community_posts(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    pod_filter: Optional[str] = Query(None, description="Filter by pod name")
+    pod_filter: Optional[str] = Query(None, description="Filter by pod name"),
+    include_total: bool = Query(True, alias="includeTotal")
 ):
     """Get all community posts visible to everyone."""
     try:
-        # Get posts from in-memory storage
-        global community_posts
-
-        # Filter by pod if specified
-        filtered_posts = community_posts
-        if pod_filter:
-            filtered_posts = [post for post in community_posts if post.get("podId") == pod_filter]
-
-        # Apply pagination
-        total = len(filtered_posts)
-        posts = filtered_posts[skip:skip + limit]
+        posts, total = await community_post_store.list_posts(pod_filter, skip, limit, include_total)
 
         return {
             "success": True,
@@ -164,57 +144,125 @@ async def get_community_posts(
             detail=f"Failed to fetch community posts: {str(e)}"
         )
 
+@router.get("/community-posts/engagement")
+async def get_community_post_engagement(
+    ids: str = Query(..., description="Comma-separated community post IDs"),
+    current_user: dict = Depends(get_current_user)
+):
+    """The current user's like, bookmark and reaction state for a page of posts."""
+    try:
+        post_ids = list(dict.fromkeys(post_id.strip() for post_id in ids.split(",") if post_id.strip()))
+        if len(post_ids) > MAX_ENGAGEMENT_POSTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_ENGAGEMENT_POSTS} post IDs per request"
+            )
+
+        engagement = await community_post_store.engagement_for(current_user["uid"], post_ids)
+
+        return {
+            "success": True,
+            "data": {"engagement": engagement}
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch engagement: {str(e)}"
+        )
+
 @router.post("/community-posts/{post_id}/like")
 async def like_community_post(
-    post_id: str
-    # Temporarily removed authentication requirement
-    # current_user: dict = Depends(get_current_user)
+    post_id: str,
+    current_user: Optional[dict] = Depends(get_optional_user)
 ):
     """Like or unlike a community post."""
     try:
-        # Find post in in-memory storage
-        global community_posts
-        post = None
-        post_index = -1
+        # Signed-out clients still share a single anonymous like
+        user_id = current_user["uid"] if current_user else "anonymous"
+        action = await community_post_store.toggle_like(post_id, user_id)
+        if not action:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found"
+            )
 
-        for i, p in enumerate(community_posts):
-            if p.get("_id") == post_id:
-                post = p
-                post_index = i
-                break
+        return {
+            "success": True,
+            "message": f"Post {action} successfully",
+            "data": {"action": action}
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to like/unlike post: {str(e)}"
+        )
 
-        if not post:
+@router.post("/community-posts/{post_id}/bookmark")
+async def bookmark_community_post(
+    post_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Bookmark or un-bookmark a community post."""
+    try:
+        action = await community_post_store.toggle_engagement(post_id, current_user["uid"], "bookmark")
+        if not action:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Post not found"
             )
 
-        # For now, just toggle like status without user tracking
-        likes = post.get("likes", [])
-        if len(likes) > 0:
-            # Unlike
-            community_posts[post_index]["likes"] = []
-            action = "unliked"
-        else:
-            # Like
-            community_posts[post_index]["likes"] = ["anonymous"]
-            action = "liked"
+        return {
+            "success": True,
+            "message": "Post bookmarked successfully" if action == "added" else "Bookmark removed successfully",
+            "data": {"action": action}
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to bookmark post: {str(e)}"
+        )
+
+@router.post("/community-posts/{post_id}/reactions/{emoji}")
+async def react_to_community_post(
+    post_id: str,
+    emoji: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Add or remove the current user's emoji reaction on a community post."""
+    try:
+        # The emoji becomes a key under reactionCounts
+        if not emoji or len(emoji) > MAX_REACTION_LENGTH or "." in emoji or emoji.startswith("$"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid reaction"
+            )
 
-        # Save to file
-        save_community_posts(community_posts)
+        action = await community_post_store.toggle_engagement(post_id, current_user["uid"], "reaction", emoji)
+        if not action:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found"
+            )
 
         return {
             "success": True,
-            "message": f"Post {action} successfully",
-            "data": {"action": action}
+            "message": "Reaction added successfully" if action == "added" else "Reaction removed successfully",
+            "data": {"action": action, "emoji": emoji}
         }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to like/unlike post: {str(e)}"
+            detail=f"Failed to react to post: {str(e)}"
         )
+
 @router.post("/")
 async def create_post(
     post_data: PostCreate,
@@ -223,7 +271,10 @@ async def create_post(
     """Create a new post."""
     try:
         # Get pod info
-        pod = await db.pods.find_one({"_id": ObjectId(post_data.podId)})
+        pod = await db.pods.find_one(
+            {"_id": ObjectId(post_data.podId)},
+            {"name": 1, "creatorId": 1, "moderators": 1}
+        )
         if not pod:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -231,7 +282,7 @@ async def create_post(
             )
 
         # Check if user is member of pod
-        if current_user["_id"] not in pod.get("members", []):
+        if not await is_member("pods", pod["_id"], current_user["_id"]):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not a member of this pod"
@@ -246,8 +297,8 @@ async def create_post(
             )
 
         post_obj = PostModel(
-            **post_data.model_dump(),
-            authorId=current_user["_id"],
+            **post_data.model_dump(exclude_none=True),
+            authorId=str(current_user["_id"]),
             authorName=current_user.get("displayName", "Anonymous"),
             authorAvatar=current_user.get("photoURL", ""),
             podName=pod.get("name", ""),
@@ -257,14 +308,16 @@ async def create_post(
 
         post_doc = post_obj.model_dump(by_alias=True, exclude_none=True)
         post_doc["_id"] = ObjectId()
+        # Store references as ObjectIds so pod queries and indexes match
+        post_doc["podId"] = pod["_id"]
+        post_doc["authorId"] = current_user["_id"]
 
         await db.posts.insert_one(post_doc)
+        adjust_total("posts", {"podId": pod["_id"]}, 1)
+        feed_timelines.publish(pod["_id"], post_doc)
 
         # Increment pod post count
-        await db.pods.update_one(
-            {"_id": ObjectId(post_data.podId)},
-            {"$inc": {"postCount": 1}}
-        )
+        counters.increment("pods", pod["_id"], "postCount")
 
         return {
             "success": True,
@@ -283,7 +336,9 @@ async def create_post(
 async def get_posts(
     pod_id: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal")
 ):
     """Get posts with optional pod filtering."""
     try:
@@ -296,10 +351,10 @@ async def get_posts(
                 )
             filter_query["podId"] = ObjectId(pod_id)
 
-        cursor = db.posts.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
+        cursor = paginate(db.posts, filter_query, skip, limit, page_cursor)
         posts = await cursor.to_list(length=limit)
 
-        total = await db.posts.count_documents(filter_query)
+        total = await get_total(db.posts, filter_query, include_total)
 
         return {
             "success": True,
@@ -307,7 +362,8 @@ async def get_posts(
                 "posts": posts,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(posts, limit)
             }
         }
     except HTTPException:
@@ -318,8 +374,53 @@ async def get_posts(
             detail=f"Failed to fetch posts: {str(e)}"
         )
 
+@router.get("/feed")
+async def get_feed(
+    limit: int = Query(20, ge=1, le=100),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    current_user: dict = Depends(get_current_user)
+):
+    """Newest posts across every pod the current user has joined."""
+    try:
+        position = decode_cursor(page_cursor) if page_cursor else None
+
+        user = await db.users.find_one({"_id": current_user["_id"]}, {"joinedPods": 1})
+        pod_ids = [ObjectId(pod_id) for pod_id in (user or {}).get("joinedPods", [])]
+
+        keys = None
+        cached = feed_timelines.wants(pod_ids)
+        if cached:
+            keys = await feed_timelines.page(current_user["_id"], pod_ids, position, limit)
+        if keys is None:
+            cached = False
+            keys = await merge_pod_keys(pod_ids, position, limit)
+        posts = await load_posts(keys)
+        if cached and len(posts) < len(keys):
+            found = {post["_id"] for post in posts}
+            feed_timelines.discard(current_user["_id"], [key for key in keys if key[1] not in found])
+
+        return {
+            "success": True,
+            "data": {
+                "posts": posts,
+                "limit": limit,
+                "nextCursor": feed_cursor(keys, limit)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch feed: {str(e)}"
+        )
+
 @router.get("/{post_id}")
-async def get_post(post_id: str):
+async def get_post(
+    post_id: str,
+    request: Request,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """Get a specific post by ID."""
     try:
         if not ObjectId.is_valid(post_id):
@@ -335,11 +436,10 @@ async def get_post(post_id: str):
                 detail="Post not found"
             )
 
-        # Increment view count
-        await db.posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"viewCount": 1}}
-        )
+        # Count the view; written back in batches
+        counters.with_pending("posts", post)
+        counters.increment("posts", post["_id"], "viewCount")
+        post["uniqueViewers"] = await unique_viewers.add("posts", post["_id"], viewer_key(request, current_user))
 
         return {
             "success": True,
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from app.database.mongo import db
 from app.models.user import UserUpdate
-from app.middleware.auth import get_current_user
+from app.middleware.auth import get_current_user, get_current_user_full
+from app.core.user_cache import invalidate_user
+from app.core.http_cache import conditional_response, PUBLIC_CACHE_CONTROL
+from app.core.profiles import PUBLIC_PROFILE_PROJECTION, to_public_profile
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.get("/")
-async def get_profile(current_user: dict = Depends(get_current_user)):
+async def get_profile(current_user: dict = Depends(get_current_user_full)):
     """Get current user's profile."""
     return {
         "success": True,
@@ -29,6 +33,7 @@ async def update_profile(
             {"_id": current_user["_id"]},
             {"$set": update_data}
         )
+        await invalidate_user(current_user.get("uid"))
         
         updated_user = await db.users.find_one({"_id": current_user["_id"]})
         
@@ -44,7 +49,7 @@ async def update_profile(
         )
 
 @router.get("/{user_id}")
-async def get_user_profile(user_id: str):
+async def get_user_profile(user_id: str, request: Request, response: Response):
     """Get a user's public profile."""
     try:
         if not ObjectId.is_valid(user_id):
@@ -53,28 +58,18 @@ async def get_user_profile(user_id: str):
                 detail="Invalid user ID"
             )
             
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, PUBLIC_PROFILE_PROJECTION)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-            
-        # Return only public profile data
-        public_profile = {
-            "id": str(user["_id"]),
-            "displayName": user.get("displayName"),
-            "photoURL": user.get("photoURL"),
-            "bio": user.get("bio"),
-            "location": user.get("location"),
-            "skills": user.get("skills", []),
-            "interests": user.get("interests", []),
-            "experience": user.get("experience"),
-            "role": user.get("role"),
-            "rating": user.get("rating", 0.0),
-            "completedProjects": user.get("completedProjects", 0),
-            "joinDate": user.get("joinDate")
-        }
+
+        not_modified = conditional_response(request, response, user, PUBLIC_CACHE_CONTROL, "rating", "completedProjects")
+        if not_modified:
+            return not_modified
+
+        public_profile = to_public_profile(user)
         
         return {
             "success": True,
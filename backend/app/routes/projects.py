@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from app.database.mongo import db
 from app.models.project import ProjectModel, ProjectCreate, ProjectUpdate
-from app.middleware.auth import get_current_user, require_user_id
+from app.core.user_cache import invalidate_user
+from app.core.totals import get_total
+from app.core.pagination import paginate, next_cursor, valid_cursor
+from app.core.http_cache import conditional_response, PUBLIC_CACHE_CONTROL
+from app.core.counters import counters
+from app.core.unique_viewers import unique_viewers, viewer_key
+from app.middleware.auth import get_current_user, get_optional_user, require_user_id
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.post("/")
 async def create_project(
@@ -34,6 +41,7 @@ async def create_project(
             {"_id": current_user["_id"]},
             {"$push": {"postedGigs": project_doc["_id"]}}
         )
+        await invalidate_user(current_user.get("uid"))
 
         return {
             "success": True,
@@ -51,23 +59,25 @@ async def get_projects(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     type: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
-    category: Optional[str] = Query(None)
+    project_status: Optional[str] = Query(None, alias="status"),
+    category: Optional[str] = Query(None),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal")
 ):
     """Get all projects with optional filtering."""
     try:
         filter_query = {}
         if type:
             filter_query["type"] = type
-        if status:
-            filter_query["status"] = status
+        if project_status:
+            filter_query["status"] = project_status
         if category:
             filter_query["category"] = category
 
-        cursor = db.projects.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
+        cursor = paginate(db.projects, filter_query, skip, limit, page_cursor)
         projects = await cursor.to_list(length=limit)
 
-        total = await db.projects.count_documents(filter_query)
+        total = await get_total(db.projects, filter_query, include_total)
 
         return {
             "success": True,
@@ -75,9 +85,12 @@ async def get_projects(
                 "projects": projects,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(projects, limit)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -85,7 +98,12 @@ async def get_projects(
         )
 
 @router.get("/{project_id}")
-async def get_project(project_id: str):
+async def get_project(
+    project_id: str,
+    request: Request,
+    response: Response,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """Get a specific project by ID."""
     try:
         if not ObjectId.is_valid(project_id):
@@ -101,11 +119,15 @@ async def get_project(project_id: str):
                 detail="Project not found"
             )
 
-        # Increment view count
-        await db.projects.update_one(
-            {"_id": ObjectId(project_id)},
-            {"$inc": {"views": 1}}
-        )
+        # Count the view; written back in batches
+        counters.with_pending("projects", project)
+        counters.increment("projects", project["_id"], "views")
+        project["uniqueViewers"] = await unique_viewers.add("projects", project["_id"], viewer_key(request, current_user))
+
+        # The view count is left out of the ETag so repeat reads can revalidate
+        not_modified = conditional_response(request, response, project, PUBLIC_CACHE_CONTROL, "applicants")
+        if not_modified:
+            return not_modified
 
         return {
             "success": True,
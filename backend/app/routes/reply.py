@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.database.mongo import db
 from app.models.reply import ReplyModel, ReplyCreate, ReplyUpdate
+from app.core.counters import counters
 from app.middleware.auth import get_current_user
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.post("/")
 async def create_reply(
@@ -37,10 +39,7 @@ async def create_reply(
         await db.replies.insert_one(reply_doc)
         
         # Increment post reply count
-        await db.posts.update_one(
-            {"_id": ObjectId(reply_data.postId)},
-            {"$inc": {"replyCount": 1}}
-        )
+        counters.increment("posts", ObjectId(reply_data.postId), "replyCount")
         
         return {
             "success": True,
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from app.database.mongo import db
 from app.models.room import RoomModel, RoomCreate, RoomUpdate
+from app.core.user_cache import invalidate_user
+from app.core.memberships import is_member, remember_membership
+from app.core.counters import counters
+from app.core.totals import get_total
+from app.core.pagination import paginate, next_cursor, valid_cursor
+from app.core.http_cache import conditional_response, PRIVATE_CACHE_CONTROL
 from app.middleware.auth import get_current_user
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
 
 @router.post("/")
 async def create_room(
@@ -50,15 +57,17 @@ async def create_room(
 @router.get("/")
 async def get_rooms(
     skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal")
 ):
     """Get all public rooms."""
     try:
         filter_query = {"isPrivate": False}
-        cursor = db.rooms.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
+        cursor = paginate(db.rooms, filter_query, skip, limit, page_cursor)
         rooms = await cursor.to_list(length=limit)
         
-        total = await db.rooms.count_documents(filter_query)
+        total = await get_total(db.rooms, filter_query, include_total)
         
         return {
             "success": True,
@@ -66,9 +75,12 @@ async def get_rooms(
                 "rooms": rooms,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(rooms, limit)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -93,7 +105,12 @@ async def get_my_rooms(current_user: dict = Depends(get_current_user)):
         )
 
 @router.get("/{room_id}")
-async def get_room(room_id: str, current_user: dict = Depends(get_current_user)):
+async def get_room(
+    room_id: str,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """Get a specific room by ID."""
     try:
         if not ObjectId.is_valid(room_id):
@@ -110,12 +127,17 @@ async def get_room(room_id: str, current_user: dict = Depends(get_current_user))
             )
             
         # Check if user can access private room
-        if room.get("isPrivate", False) and current_user["_id"] not in room.get("members", []):
+        if room.get("isPrivate", False) and not await is_member("rooms", room["_id"], current_user["_id"]):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to access this room"
             )
-            
+
+        counters.with_pending("rooms", room)
+        not_modified = conditional_response(request, response, room, PRIVATE_CACHE_CONTROL, "members", "messageCount")
+        if not_modified:
+            return not_modified
+
         return {
             "success": True,
             "data": {"room": room}
@@ -138,34 +160,32 @@ async def join_room(room_id: str, current_user: dict = Depends(get_current_user)
                 detail="Invalid room ID"
             )
             
-        room = await db.rooms.find_one({"_id": ObjectId(room_id)})
-        if not room:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Room not found"
-            )
-            
-        # Check if already a member
-        if current_user["_id"] in room.get("members", []):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Already a member of this room"
-            )
-            
-        # Add user to room
-        await db.rooms.update_one(
-            {"_id": ObjectId(room_id)},
+        # Add user to room; the members match makes repeat joins a no-op
+        result = await db.rooms.update_one(
+            {"_id": ObjectId(room_id), "members": {"$ne": current_user["_id"]}},
             {
                 "$addToSet": {"members": current_user["_id"]},
                 "$inc": {"memberCount": 1}
             }
         )
+        if result.matched_count == 0:
+            if not await db.rooms.find_one({"_id": ObjectId(room_id)}, {"_id": 1}):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Room not found"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Already a member of this room"
+            )
+        remember_membership("rooms", ObjectId(room_id), current_user["_id"])
         
         # Add room to user's joined rooms
         await db.users.update_one(
             {"_id": current_user["_id"]},
             {"$addToSet": {"joinedRooms": ObjectId(room_id)}}
         )
+        await invalidate_user(current_user.get("uid"))
         
         return {
             "success": True,
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from app.core.search import search, SEARCH_TYPES, SEARCH_MAX_RESULTS
+from app.core.responses import BSONRoute
+from app.routes.posts import community_post_store
+from typing import Optional
+
+router = APIRouter(route_class=BSONRoute)
+
+MAX_QUERY_LENGTH = 200
+
+@router.get("/")
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=MAX_QUERY_LENGTH),
+    search_types: Optional[str] = Query(None, alias="type"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=50),
+    include_facets: bool = Query(True, alias="includeFacets")
+):
+    """Search projects, pods, posts, users and community posts by relevance."""
+    try:
+        types = [name.strip() for name in search_types.split(",") if name.strip()] if search_types else list(SEARCH_TYPES)
+        unknown = [name for name in types if name not in SEARCH_TYPES]
+        if unknown or not types:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid search type; expected any of: {', '.join(SEARCH_TYPES)}"
+            )
+        if skip + limit > SEARCH_MAX_RESULTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Only the first {SEARCH_MAX_RESULTS} matches can be paged through"
+            )
+
+        found = await search(q, types, skip, limit, community_post_store, include_facets)
+
+        return {
+            "success": True,
+            "data": {
+                "results": found["results"],
+                "facets": found["facets"],
+                "total": found["total"],
+                "skip": skip,
+                "limit": limit
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search: {str(e)}"
+        )
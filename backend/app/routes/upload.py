@@ -1,47 +1,216 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
 from app.middleware.auth import get_current_user
-import aiofiles
-import os
-from datetime import datetime
-import uuid
+from app.core.uploads import (
+    UPLOAD_MAX_BYTES, UPLOAD_SESSION_CHUNK_SIZE, MULTIPART_OVERHEAD,
+    UploadTooLarge, UploadOffsetMismatch, UploadIncomplete, InvalidUpload,
+    normalize_extension, store_stream, multipart_file, blob_name, blob_url,
+    create_upload_session, load_upload_session, session_offset,
+    append_session_chunk, finalize_upload_session, delete_upload_session
+)
+from app.core.images import is_image, schedule_variants, variant_urls
+from app.core.responses import BSONRoute
+from pydantic import BaseModel, Field
+from typing import Optional
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., ge=1)
+
+def upload_result(filename: Optional[str], content_hash: str, extension: str, size: int, deduplicated: bool) -> dict:
+    """Response data for a stored upload, scheduling image variants for new images."""
+    data = {
+        "filename": filename,
+        "url": blob_url(content_hash, extension),
+        "size": size,
+        "sha256": content_hash,
+        "deduplicated": deduplicated
+    }
+    if is_image(extension):
+        name = blob_name(content_hash, extension)
+        if not deduplicated:
+            schedule_variants(name)
+        data["variants"] = variant_urls(name)
+    return data
+
+def session_status(session: dict) -> dict:
+    return {
+        "sessionId": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session_offset(session["id"]),
+        "chunkSize": UPLOAD_SESSION_CHUNK_SIZE,
+        "expiresAt": session["expiresAt"]
+    }
+
+def get_owned_session(session_id: str, current_user: dict) -> dict:
+    """Load an upload session, ensuring it belongs to the current user."""
+    session = load_upload_session(session_id)
+    if not session or session["ownerId"] != str(current_user["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    return session
 
 @router.post("/")
 async def upload_file(
-    file: UploadFile = File(...),
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload a file."""
+    """Upload a file sent as the multipart field ``file``.
+
+    The body is parsed as it streams in, so an oversized upload is
+    rejected as soon as it passes the limit, with or without a
+    Content-Length. Files are stored under their SHA-256, so uploading
+    identical content again returns the existing URL without storing a
+    second copy.
+    """
     try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Return file URL
-        file_url = f"/uploads/{unique_filename}"
-        
+        # Reject obviously oversized bodies before touching the disk
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD:
+            raise UploadTooLarge(UPLOAD_MAX_BYTES)
+
+        filename, chunks = await multipart_file(request.headers.get("content-type", ""), request.stream())
+        extension = normalize_extension(filename)
+        content_hash, size, deduplicated = await store_stream(chunks, extension)
+
         return {
             "success": True,
             "message": "File uploaded successfully",
+            "data": upload_result(filename, content_hash, extension, size, deduplicated)
+        }
+    except InvalidUpload as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload file: {str(e)}"
+        )
+
+# Resumable upload sessions
+
+@router.post("/sessions")
+async def create_session(
+    session_data: UploadSessionCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Start a resumable upload; chunks are then PUT in order."""
+    try:
+        session = create_upload_session(str(current_user["_id"]), session_data.filename, session_data.size)
+        return {
+            "success": True,
+            "data": session_status(session)
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create upload session: {str(e)}"
+        )
+
+@router.get("/sessions/{session_id}")
+async def get_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a session's offset, e.g. to resume after a dropped connection."""
+    session = get_owned_session(session_id, current_user)
+    return {
+        "success": True,
+        "data": session_status(session)
+    }
+
+@router.put("/sessions/{session_id}")
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Append the raw request body at ``offset``, streaming it to disk."""
+    try:
+        session = get_owned_session(session_id, current_user)
+        new_offset = await append_session_chunk(session, offset, request.stream())
+        return {
+            "success": True,
             "data": {
-                "filename": file.filename,
-                "url": file_url,
-                "size": len(content)
+                "sessionId": session_id,
+                "offset": new_offset,
+                "size": session["size"]
             }
         }
+    except UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Chunk does not start at the current offset ({e.offset})",
+            headers={"Upload-Offset": str(e.offset)}
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Chunk runs past the declared size of {e.max_bytes} bytes"
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to upload file: {str(e)}"
+            detail=f"Failed to upload chunk: {str(e)}"
+        )
+
+@router.post("/sessions/{session_id}/complete")
+async def complete_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Finalize a fully uploaded session into a stored file."""
+    try:
+        session = get_owned_session(session_id, current_user)
+        content_hash, size, deduplicated = await finalize_upload_session(session)
+        return {
+            "success": True,
+            "message": "File uploaded successfully",
+            "data": upload_result(session["filename"], content_hash, session["extension"], size, deduplicated)
+        }
+    except UploadIncomplete as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to complete upload: {str(e)}"
         )
+
+@router.delete("/sessions/{session_id}")
+async def cancel_session(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Abandon an upload session and discard its data."""
+    get_owned_session(session_id, current_user)
+    delete_upload_session(session_id)
+    return {
+        "success": True,
+        "message": "Upload session cancelled"
+    }
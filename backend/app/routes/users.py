@@ -1,21 +1,66 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from app.database.mongo import db
+from app.core.totals import get_total
+from app.core.pagination import paginate, next_cursor, valid_cursor
+from app.core.http_cache import conditional_response, PUBLIC_CACHE_CONTROL
+from app.core.profiles import PUBLIC_PROFILE_PROJECTION, to_public_profile
 from app.middleware.auth import get_current_user
+from app.core.responses import BSONRoute
 from datetime import datetime
 from bson import ObjectId
 from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=BSONRoute)
+
+# Most users a single ?ids= batch may request
+MAX_BATCH_USERS = 100
+
+async def get_users_by_ids(ids: str) -> dict:
+    """Public profiles for a batch of user IDs, in the order requested.
+
+    Unknown IDs are listed under ``missing`` rather than failing the batch.
+    """
+    user_ids = list(dict.fromkeys(user_id.strip() for user_id in ids.split(",") if user_id.strip()))
+    if len(user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_USERS} user IDs per request"
+        )
+    if not all(ObjectId.is_valid(user_id) for user_id in user_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user ID"
+        )
+
+    cursor = db.users.find(
+        {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+        PUBLIC_PROFILE_PROJECTION
+    )
+    found = {str(user["_id"]): user async for user in cursor}
+
+    return {
+        "success": True,
+        "data": {
+            "users": [to_public_profile(found[user_id]) for user_id in user_ids if user_id in found],
+            "missing": [user_id for user_id in user_ids if user_id not in found]
+        }
+    }
 
 @router.get("/")
 async def get_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     role: Optional[str] = Query(None),
-    skills: Optional[str] = Query(None)
+    skills: Optional[str] = Query(None),
+    page_cursor: Optional[str] = Depends(valid_cursor),
+    include_total: bool = Query(True, alias="includeTotal"),
+    ids: Optional[str] = Query(None, description="Comma-separated user IDs to fetch in one batch")
 ):
-    """Get all users with optional filtering."""
+    """Get all users with optional filtering, or a batch of users by ID."""
     try:
+        if ids is not None:
+            return await get_users_by_ids(ids)
+
         filter_query = {}
         if role:
             filter_query["role"] = role
@@ -23,29 +68,13 @@ async def get_users(
             skill_list = [s.strip() for s in skills.split(",")]
             filter_query["skills"] = {"$in": skill_list}
 
-        cursor = db.users.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
+        cursor = paginate(db.users, filter_query, skip, limit, page_cursor, PUBLIC_PROFILE_PROJECTION)
         users = await cursor.to_list(length=limit)
 
         # Return only public profile data
-        public_users = []
-        for user in users:
-            public_user = {
-                "id": str(user["_id"]),
-                "displayName": user.get("displayName"),
-                "photoURL": user.get("photoURL"),
-                "bio": user.get("bio"),
-                "location": user.get("location"),
-                "skills": user.get("skills", []),
-                "interests": user.get("interests", []),
-                "experience": user.get("experience"),
-                "role": user.get("role"),
-                "rating": user.get("rating", 0.0),
-                "completedProjects": user.get("completedProjects", 0),
-                "joinDate": user.get("joinDate")
-            }
-            public_users.append(public_user)
+        public_users = [to_public_profile(user) for user in users]
 
-        total = await db.users.count_documents(filter_query)
+        total = await get_total(db.users, filter_query, include_total)
 
         return {
             "success": True,
@@ -53,9 +82,12 @@ async def get_users(
                 "users": public_users,
                 "total": total,
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "nextCursor": next_cursor(users, limit)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -63,7 +95,7 @@ async def get_users(
         )
 
 @router.get("/{user_id}")
-async def get_user(user_id: str):
+async def get_user(user_id: str, request: Request, response: Response):
     """Get a user's public profile by ID."""
     try:
         if not ObjectId.is_valid(user_id):
@@ -72,28 +104,18 @@ async def get_user(user_id: str):
                 detail="Invalid user ID"
             )
 
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, PUBLIC_PROFILE_PROJECTION)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        # Return only public profile data
-        public_profile = {
-            "id": str(user["_id"]),
-            "displayName": user.get("displayName"),
-            "photoURL": user.get("photoURL"),
-            "bio": user.get("bio"),
-            "location": user.get("location"),
-            "skills": user.get("skills", []),
-            "interests": user.get("interests", []),
-            "experience": user.get("experience"),
-            "role": user.get("role"),
-            "rating": user.get("rating", 0.0),
-            "completedProjects": user.get("completedProjects", 0),
-            "joinDate": user.get("joinDate")
-        }
+        not_modified = conditional_response(request, response, user, PUBLIC_CACHE_CONTROL, "rating", "completedProjects")
+        if not_modified:
+            return not_modified
+
+        public_profile = to_public_profile(user)
 
         return {
             "success": True,
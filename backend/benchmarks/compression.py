@@ -0,0 +1,137 @@
+"""Bandwidth/latency trade-off of response compression on list payloads.
+
+Builds the largest pages that get_room_messages and get_community_posts
+return (100 documents) from the repo's JSON data, then measures:
+
+* compressed size and CPU cost for gzip and brotli at several levels
+* estimated time to deliver each encoding over slow and fast links
+* end-to-end request latency through CompressionMiddleware
+
+Pages are padded to 100 documents by repeating the file's documents, which
+flatters brotli's larger window on pages dominated by repeated base64 avatars.
+
+Usage (from backend/):
+    python -m benchmarks.compression [--repeat 50]
+"""
+import argparse
+import gzip
+import json
+import statistics
+import time
+import zlib
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware
+
+PAGE_SIZE = 100
+# Link speeds in megabits per second
+LINKS = {"3G (1.6 Mbps)": 1.6, "4G (12 Mbps)": 12, "broadband (100 Mbps)": 100}
+
+
+def load_page(path: str, key: str) -> dict:
+    """A full page of documents shaped like the list endpoint's response."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    documents = data if isinstance(data, list) else [m for messages in data.values() for m in messages]
+    page = [dict(documents[i % len(documents)], _id=f"{i:024x}") for i in range(PAGE_SIZE)]
+    return {
+        "success": True,
+        "data": {key: page, "total": len(documents), "skip": 0, "limit": PAGE_SIZE}
+    }
+
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def encoders() -> Dict[str, tuple]:
+    encs = {
+        "gzip-1": (lambda b: gzip.compress(b, 1), gzip.decompress),
+        "gzip-6": (lambda b: gzip.compress(b, 6), gzip.decompress),
+        "gzip-9": (lambda b: gzip.compress(b, 9), gzip.decompress),
+    }
+    if compression.brotli is not None:
+        brotli = compression.brotli
+        for quality in (1, 4, 11):
+            encs[f"br-{quality}"] = (
+                lambda b, q=quality: brotli.compress(b, quality=q),
+                brotli.decompress
+            )
+    return encs
+
+
+def bench_codecs(name: str, payload: dict, repeat: int):
+    body = json.dumps(payload, default=str).encode("utf-8")
+    print(f"\n== {name}: {len(body):,} bytes uncompressed")
+    header = f"{'encoding':<10}{'bytes':>12}{'ratio':>8}{'comp ms':>10}{'decomp ms':>11}"
+    header += "".join(f"{label:>22}" for label in LINKS)
+    print(header)
+
+    rows = [("identity", body, 0.0, 0.0)]
+    for label, (compress, decompress) in encoders().items():
+        compressed = compress(body)
+        rows.append((
+            label,
+            compressed,
+            median_ms(lambda: compress(body), repeat),
+            median_ms(lambda: decompress(compressed), repeat)
+        ))
+
+    for label, data, compress_ms, decompress_ms in rows:
+        line = f"{label:<10}{len(data):>12,}{len(body) / len(data):>8.1f}{compress_ms:>10.2f}{decompress_ms:>11.2f}"
+        for mbps in LINKS.values():
+            transfer_ms = len(data) * 8 / (mbps * 1000)
+            line += f"{compress_ms + transfer_ms + decompress_ms:>19.1f} ms"
+        print(line)
+
+
+def bench_middleware(payloads: Dict[str, dict], repeat: int):
+    app = FastAPI()
+    for name, payload in payloads.items():
+        app.add_api_route(f"/{name}", lambda payload=payload: payload)
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+
+    print("\n== End-to-end through CompressionMiddleware (in-process, no network)")
+    print(f"{'payload':<18}{'Accept-Encoding':<18}{'wire bytes':>12}{'median ms':>11}")
+    for name in payloads:
+        for accept in ("identity", "gzip", "br"):
+            if accept == "br" and compression.brotli is None:
+                continue
+            headers = {"Accept-Encoding": accept}
+            response = client.get(f"/{name}", headers=headers)
+            wire_bytes = response.num_bytes_downloaded
+            latency = median_ms(lambda: client.get(f"/{name}", headers=headers), repeat)
+            print(f"{name:<18}{accept:<18}{wire_bytes:>12,}{latency:>11.2f}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--room-messages", default="room_messages.json")
+    parser.add_argument("--community-posts", default="community_posts.json")
+    args = parser.parse_args(argv)
+
+    payloads = {
+        "room_messages": load_page(args.room_messages, "messages"),
+        "community_posts": load_page(args.community_posts, "posts"),
+    }
+    print(f"zlib {zlib.ZLIB_VERSION}, brotli {'available' if compression.brotli else 'not installed'}; "
+          f"middleware: min size {compression.COMPRESSION_MIN_SIZE} B, "
+          f"gzip level {compression.COMPRESSION_GZIP_LEVEL}, brotli quality {compression.COMPRESSION_BROTLI_QUALITY}")
+    for name, payload in payloads.items():
+        bench_codecs(name, payload, args.repeat)
+    bench_middleware(payloads, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmark: jsonable_encoder + JSONResponse vs BSONJSONResponse.
+
+Builds a 100-message page from room_messages.json, converted to what
+Mongo returns (ObjectId ids, datetime timestamps), and times rendering
+it to bytes both ways:
+
+* FastAPI's default path: jsonable_encoder (with an ObjectId encoder,
+  which it needs to handle Mongo documents at all) then json.dumps
+* BSONJSONResponse: a single orjson call
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--repeat 200]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import BSONJSONResponse
+
+PAGE_SIZE = 100
+
+
+def load_page(path: str) -> dict:
+    """A page of room messages shaped like documents read from Mongo."""
+    with open(path, 'r') as f:
+        rooms = json.load(f)
+    messages = [message for room in rooms.values() for message in room]
+
+    page = []
+    for i in range(PAGE_SIZE):
+        message = dict(messages[i % len(messages)])
+        message["_id"] = ObjectId()
+        message["roomId"] = ObjectId()
+        message["authorId"] = ObjectId()
+        message["createdAt"] = datetime.fromisoformat(message.pop("timestamp"))
+        message["updatedAt"] = message["createdAt"]
+        page.append(message)
+    return {
+        "success": True,
+        "data": {"messages": page, "total": len(messages), "skip": 0, "limit": PAGE_SIZE}
+    }
+
+
+def median_us(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(timings)
+
+
+def default_path(payload: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(payload, custom_encoder={ObjectId: str})).body
+
+
+def bson_path(payload: dict) -> bytes:
+    return BSONJSONResponse(payload).body
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--room-messages", default="room_messages.json")
+    args = parser.parse_args(argv)
+
+    payload = load_page(args.room_messages)
+    default_body = default_path(payload)
+    bson_body = bson_path(payload)
+    assert json.loads(default_body) == json.loads(bson_body), "the two paths disagree"
+
+    print(f"{PAGE_SIZE}-message page, {len(bson_body):,} bytes of JSON")
+    print(f"{'path':<34}{'median us':>12}{'speedup':>10}")
+    encoder_only = median_us(lambda: jsonable_encoder(payload, custom_encoder={ObjectId: str}), args.repeat)
+    baseline = median_us(lambda: default_path(payload), args.repeat)
+    fast = median_us(lambda: bson_path(payload), args.repeat)
+    print(f"{'jsonable_encoder only':<34}{encoder_only:>12.0f}")
+    print(f"{'jsonable_encoder + JSONResponse':<34}{baseline:>12.0f}{1.0:>9.1f}x")
+    print(f"{'BSONJSONResponse (orjson)':<34}{fast:>12.0f}{baseline / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
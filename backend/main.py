@@ -1,24 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from pymongo.errors import OperationFailure
+
+# Load environment before importing modules that read configuration at import time
+load_dotenv()
 
 # Import routers
-from app.routes import auth, projects, profile, upload, pods, posts, reply, rooms, messages, users
+from app.routes import auth, projects, profile, upload, pods, posts, reply, rooms, messages, users, search
 
 # Import database and firebase
 from app.database.mongo import db
-from app.core.firebase import initialize_firebase
-
-load_dotenv()
+from app.database.redis import close_redis
+from app.core.pubsub import hub
+from app.core.recent_messages import recent_messages
+from app.core.counters import counters
+from app.core.unique_viewers import unique_viewers
+from app.core.search import create_search_indexes
+from app.core.uploads import UPLOAD_DIR
+from app.core.images import UploadStaticFiles, shutdown_image_pool
+from app.middleware.compression import CompressionMiddleware
+from app.core.responses import BSONJSONResponse
+from app.core.firebase import initialize_firebase, refresh_public_keys_periodically
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("INFO: Application startup sequence initiated.")
     initialize_firebase()
+    cert_refresh_task = asyncio.create_task(refresh_public_keys_periodically())
     # Connect to MongoDB
     try:
         await db.connect()
@@ -30,24 +43,87 @@ async def lifespan(app: FastAPI):
         print("INFO: Creating MongoDB indexes...")
         await db.users.create_index("email", unique=True)
         await db.users.create_index("uid", unique=True)
+        await db.users.create_index([("createdAt", -1), ("_id", -1)])
         await db.pods.create_index("slug", unique=True)
-        await db.posts.create_index([("podId", 1), ("createdAt", -1)])
+        await db.pods.create_index([("isPrivate", 1), ("createdAt", -1), ("_id", -1)])
+        await db.pods.create_index([("members", 1)])
+        await db.posts.create_index([("podId", 1), ("createdAt", -1), ("_id", -1)])
+        await db.posts.create_index([("createdAt", -1), ("_id", -1)])
         await db.replies.create_index([("postId", 1), ("createdAt", 1)])
         await db.rooms.create_index([("name", 1)])
         await db.rooms.create_index([("members", 1)])
-        await db.messages.create_index([("roomId", 1), ("createdAt", 1)])
+        await db.rooms.create_index([("isPrivate", 1), ("createdAt", -1), ("_id", -1)])
+        await db.messages.create_index([("roomId", 1), ("createdAt", 1), ("_id", 1)])
         await db.projects.create_index([("authorId", 1), ("createdAt", -1)])
+        await db.projects.create_index([("createdAt", -1), ("_id", -1)])
         await db.communityPosts.create_index([("createdAt", -1)])
         await db.communityPosts.create_index([("podId", 1), ("createdAt", -1)])
+        await db.communityEngagements.create_index(
+            [("userId", 1), ("postId", 1), ("kind", 1), ("emoji", 1)], unique=True
+        )
+        await create_search_indexes()
+        # Superseded by the indexes above that end in _id
+        for collection, index_name in ((db.posts, "podId_1_createdAt_-1"), (db.messages, "roomId_1_createdAt_1")):
+            try:
+                await collection.drop_index(index_name)
+            except OperationFailure:
+                pass  # Already dropped
         print("INFO: MongoDB indexes created successfully.")
     except Exception as e:
         print(f"ERROR: Failed to create MongoDB indexes: {e}")
 
+    # Migrate legacy room messages before any request reads them
+    try:
+        await messages.room_message_store.start()
+    except Exception as e:
+        print(f"ERROR: Failed to migrate room messages: {e}")
+
+    # Start realtime message fan-out
+    try:
+        await hub.start()
+    except Exception as e:
+        print(f"ERROR: Failed to start message hub: {e}")
+
+    # Start write-behind counter and viewer sketch flushing
+    await counters.start()
+    await unique_viewers.start()
+
     print("INFO: Startup tasks completed. Application ready to serve.")
     yield
 
     print("INFO: Application shutdown sequence initiated.")
-    # Close MongoDB connection
+    cert_refresh_task.cancel()
+    await hub.close()
+    shutdown_image_pool()
+
+    # Write buffered view/message/reply/post counts before MongoDB closes
+    try:
+        await counters.close()
+    except Exception as e:
+        print(f"ERROR: Failed to flush counters: {e}")
+
+    try:
+        await unique_viewers.close()
+    except Exception as e:
+        print(f"ERROR: Failed to save viewer sketches: {e}")
+
+    # Compact room message logs and write pending JSON-file store changes
+    try:
+        await messages.room_message_store.close()
+    except Exception as e:
+        print(f"ERROR: Failed to close room message store: {e}")
+
+    try:
+        await posts.community_post_store.close()
+    except Exception as e:
+        print(f"ERROR: Failed to close community post store: {e}")
+
+    # Close Redis and MongoDB connections
+    try:
+        await close_redis()
+    except Exception as e:
+        print(f"ERROR: Failed to close Redis connection: {e}")
+
     try:
         await db.close()
     except Exception as e:
@@ -59,7 +135,8 @@ app = FastAPI(
     title="EarnBuddy API",
     description="Backend API for EarnBuddy platform",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=BSONJSONResponse
 )
 
 # ✅ CORS middleware - unified setup
@@ -83,8 +160,12 @@ app.add_middleware(
     max_age=86400          # Cache preflight for 24 hours
 )
 
+# Compress JSON responses (uploads are served as stored)
+app.add_middleware(CompressionMiddleware)
+
 # Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # Health check endpoint
 @app.get("/api/health")
@@ -95,6 +176,17 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# In-process memory use of the caches and in-memory stores (unauthenticated, so opt-in)
+HEALTH_MEMORY_ENABLED = os.getenv("HEALTH_MEMORY_ENABLED", "false").lower() == "true"
+
+if HEALTH_MEMORY_ENABLED:
+    @app.get("/api/health/memory")
+    async def memory_stats():
+        return {
+            "communityPosts": posts.community_post_store.stats(),
+            "recentMessages": recent_messages.stats()
+        }
+
 # CORS test endpoint
 @app.options("/api/cors-test")
 async def cors_test_options():
@@ -117,6 +209,7 @@ app.include_router(reply.router, prefix="/api/replies", tags=["Replies"])
 app.include_router(rooms.router, prefix="/api/rooms", tags=["Rooms"])
 app.include_router(messages.router, prefix="/api/messages", tags=["Messages"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
 
 # Root endpoint
 @app.get("/")
@@ -79,10 +79,19 @@ export const communityPostsAPI = {
     return response.data;
   },
 
-  // Like/unlike a community post
-  likePost: async (postId: string) => {
-    // Don't send auth headers for likes (temporarily)
-    const response = await axios.post(`${import.meta.env.VITE_API_URL || 'https://earnbuddy-g88i.onrender.com'}/api/posts/community-posts/${postId}/like`);
+  // Like/unlike a community post (counted per user when an ID token is passed)
+  likePost: async (postId: string, token?: string) => {
+    const headers = token ? { Authorization: `Bearer ${token}` } : undefined;
+    const response = await axios.post(`${import.meta.env.VITE_API_URL || 'https://earnbuddy-g88i.onrender.com'}/api/posts/community-posts/${postId}/like`, null, { headers });
+    return response.data;
+  },
+
+  // The signed-in user's liked/bookmarked/reactions state for up to 100 posts
+  getEngagement: async (postIds: string[], token: string) => {
+    const response = await axios.get(`${import.meta.env.VITE_API_URL || 'https://earnbuddy-g88i.onrender.com'}/api/posts/community-posts/engagement`, {
+      params: { ids: postIds.join(',') },
+      headers: { Authorization: `Bearer ${token}` }
+    });
     return response.data;
   }
 };
@@ -73,7 +73,8 @@ const CommunityPage: React.FC = () => {
         new Date(post.createdAt.toDate()).toLocaleDateString() :
         new Date(post.createdAt).toLocaleDateString()
       ) : 'Just now',
-    likes: post.likes || [], // Keep as array for like functionality
+    likeCount: post.likeCount ?? post.likes?.length ?? 0,
+    liked: post.liked ?? post.likes?.includes(currentUser?.uid || '') ?? false,
     comments: post.comments?.length || 0,
     shares: 0,
     pod: post.podId === 'community' ? 'Community' : post.podId,
@@ -187,6 +188,24 @@ const CommunityPage: React.FC = () => {
         console.error('Error loading from backend API:', apiError);
       }
 
+      // Backend posts only carry counts; who liked what is fetched per user
+      if (currentUser && apiPosts.length > 0) {
+        try {
+          const token = await currentUser.getIdToken();
+          const engagementResponse = await communityPostsAPI.getEngagement(
+            apiPosts.slice(0, 100).map((post: any) => post.id),
+            token
+          );
+          const engagement = engagementResponse.data?.engagement || {};
+          apiPosts = apiPosts.map((post: any) => ({
+            ...post,
+            liked: engagement[post.id]?.liked ?? false
+          }));
+        } catch (engagementError) {
+          console.error('Error loading post engagement:', engagementError);
+        }
+      }
+
       // Load posts from localStorage as fallback (these are always available)
       const localPosts = JSON.parse(localStorage.getItem('localCommunityPosts') || '[]');
       const formattedLocalPosts = localPosts.map((post: any) => ({
@@ -584,7 +603,8 @@ const CommunityPage: React.FC = () => {
                                 <motion.button
                                   onClick={async () => {
                                     try {
-                                      await communityPostsAPI.likePost(post.id);
+                                      const token = currentUser ? await currentUser.getIdToken() : undefined;
+                                      await communityPostsAPI.likePost(post.id, token);
                                       // Refresh posts to show updated like count
                                       await loadCommunityPosts();
                                     } catch (error) {
@@ -592,7 +612,7 @@ const CommunityPage: React.FC = () => {
                                     }
                                   }}
                                   className={`flex items-center gap-2 transition-colors ${
-                                    post.likes?.includes(currentUser?.uid || '')
+                                    post.liked
                                       ? 'text-red-500'
                                       : 'text-gray-500 hover:text-red-500'
                                   }`}
@@ -600,9 +620,9 @@ const CommunityPage: React.FC = () => {
                                   whileTap={{ scale: 0.95 }}
                                 >
                                   <Heart className={`w-5 h-5 ${
-                                    post.likes?.includes(currentUser?.uid || '') ? 'fill-current' : ''
+                                    post.liked ? 'fill-current' : ''
                                   }`} />
-                                  <span>{post.likes?.length || 0}</span>
+                                  <span>{post.likeCount}</span>
                                 </motion.button>
 
                                 <motion.button